@@ -0,0 +1,98 @@
+import copy
+import itertools
+import numpy
+import pandas
+from multiprocessing import Pool, shared_memory
+from SIAX.Backtest.Backtesting_Vectorizado import Backtest
+
+class BacktestSweep:
+    """
+    Barrido de parámetros sobre "Backtest.run", repartido en un pool de procesos.
+    El dataset se redondea a "PS" y se copia UNA vez a memoria compartida: cada
+    proceso arma su propio Backtest sobre esa memoria al arrancar, sin copiarla
+    ("copy = False"), y sólo los parámetros viajan por tarea.
+    La grilla es un dict {parámetro: [valores]}. "compound", "risk" y "max_trades"
+    van a "Backtest.run". Cualquier otra clave se setea como atributo de una copia
+    de la estrategia antes de correr (ej.: el multiplicador de SL de una subclase).
+    Devuelve un DataFrame con una fila por configuración: sus parámetros, el capital
+    final y las métricas de "stats()" como columnas "<métrica> <columna>".
+    """
+
+    _RunParams = ["compound", "risk", "max_trades"]  # Parámetros de "Backtest.run".
+    _Worker = dict()  # Estado de cada proceso del pool: Backtest y estrategia.
+
+    ##########################################################################
+    def __init__(self, Dataset, Strategy, processes = None, engine = "numpy", **backtest_kwargs):
+        self.Dataset = Dataset  # Dataset OHLC, de sólo lectura.
+        self.Strategy = Strategy  # Se envía una sola vez a cada proceso.
+        self.Processes = processes  # "None": tantos procesos como núcleos.
+        self.Engine = engine  # Motor de "Backtest.run" ("numpy" o "pandas").
+        self.Backtest_kwargs = backtest_kwargs  # "deposit", "PS", "PV", "minLot".
+
+    ##########################################################################
+    def run(self, grid):
+        names = list(grid.keys())
+        configs = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+        index = self.Dataset.index
+        assert isinstance(index, pandas.DatetimeIndex) or (index.dtype.kind in "iuf"), \
+               "\"Dataset\" index must be datetime or numeric to be shared."
+        tz = getattr(index, "tz", None)  # Fechas con zona horaria: compartir en UTC.
+        PS = self.Backtest_kwargs.get("PS", 0.01)  # Mismo valor por defecto que "Backtest".
+        values = Backtest.round_prices(self.Dataset.to_numpy(dtype = float), PS)
+        stamps = (index.tz_convert(None) if tz else index).to_numpy()
+        shared = [BacktestSweep._share(values), BacktestSweep._share(stamps)]
+        spec = {"values": shared[0][1], "index": shared[1][1],
+                "columns": list(self.Dataset.columns), "tz": tz}
+        initargs = (spec, self.Strategy, self.Engine, self.Backtest_kwargs)
+        try:
+            with Pool(self.Processes, BacktestSweep._init_worker, initargs) as pool:
+                rows = pool.map(BacktestSweep._run_config, configs)
+        finally:  # Liberar la memoria compartida aunque falle algún proceso.
+            for memory, _ in shared:
+                memory.close() ; memory.unlink()
+        return pandas.DataFrame(rows)
+
+    ##########################################################################
+    @staticmethod
+    def _share(array):
+        memory = shared_memory.SharedMemory(create = True, size = max(1, array.nbytes))
+        view = numpy.ndarray(array.shape, dtype = array.dtype, buffer = memory.buf)
+        view[...] = array  # Única copia del dataset.
+        return memory, (memory.name, array.shape, array.dtype.str)
+
+    @staticmethod
+    def _attach(spec):
+        name, shape, dtype = spec
+        memory = shared_memory.SharedMemory(name = name)
+        return memory, numpy.ndarray(shape, dtype = dtype, buffer = memory.buf)
+
+    ##########################################################################
+    @staticmethod
+    def _init_worker(spec, Strategy, engine, backtest_kwargs):
+        memories, (values, stamps) = zip(*[BacktestSweep._attach(spec[key])
+                                           for key in ["values", "index"]])
+        index = pandas.Index(stamps)
+        if spec["tz"]: index = index.tz_localize("UTC").tz_convert(spec["tz"])
+        Dataset = pandas.DataFrame(values, index = index, columns = spec["columns"], copy = False)
+        BacktestSweep._Worker.update({"Memories": memories, "Strategy": Strategy, "Engine": engine,
+                                      "Backtest": Backtest(Dataset, verbose = 0, copy = False,
+                                                           **backtest_kwargs)})
+
+    ##########################################################################
+    @staticmethod
+    def _run_config(config):
+        worker = BacktestSweep._Worker
+        Strategy = copy.copy(worker["Strategy"])  # Copia para no pisar la original.
+        run_kwargs = {key: value for key, value in config.items() if key in BacktestSweep._RunParams}
+        for key, value in config.items():
+            if key not in BacktestSweep._RunParams: setattr(Strategy, key, value)
+        Test = worker["Backtest"]  # Mismo Backtest para todas las tareas del proceso.
+        Test.run(Strategy, engine = worker["Engine"], **run_kwargs)
+        row = dict(config)
+        row["Capital"] = pandas.to_numeric(Test.Dataset["$"]).dropna().iloc[-1]
+        Stats = Test.stats()
+        if (Stats is not None):
+            for column in Stats.columns:
+                for metric, value in Stats[column].items():
+                    row[f"{metric} {column}"] = value
+        return row
@@ -0,0 +1,69 @@
+import numpy
+import pandas
+
+class TradeLedger:
+    """
+    Registro de operaciones guardado por columnas, en arrays de numpy preasignados.
+    Agregar una fila es O(1) (la capacidad se duplica cuando se llena), y sólo se
+    arma un DataFrame cuando alguien lo lee con "frame". Ese DataFrame queda en
+    cache hasta la próxima modificación del registro.
+    "columns" es un dict {columna: dtype}, por ejemplo: {"OP": float, "OT": object}.
+    """
+
+    ##########################################################################
+    def __init__(self, columns, capacity = 256):
+        self.Columns = list(columns)  # Orden de columnas, igual que en el DataFrame.
+        self.Dtypes = dict(columns)  # Tipo de dato de cada columna.
+        self.Data = {label: numpy.empty(capacity, dtype = dtype)
+                     for label, dtype in self.Dtypes.items()}
+        self.Size = 0  # Cantidad de filas ocupadas.
+        self.Frame = None  # DataFrame en cache.
+
+    ##########################################################################
+    def __len__(self):
+        return self.Size
+
+    ##########################################################################
+    def append(self, row):
+        if (self.Size == len(self.Data[self.Columns[0]])): self.grow()
+        for label, value in zip(self.Columns, row):
+            self.Data[label][self.Size] = value
+        self.Size = self.Size + 1
+        self.Frame = None
+
+    ##########################################################################
+    def grow(self):
+        capacity = 2*max(1, len(self.Data[self.Columns[0]]))  # Duplicar capacidad.
+        for label, values in self.Data.items():
+            self.Data[label] = numpy.empty(capacity, dtype = values.dtype)
+            self.Data[label][:self.Size] = values[:self.Size]
+
+    ##########################################################################
+    def row(self, n):
+        return [self.Data[label][n] for label in self.Columns]
+
+    ##########################################################################
+    def pop(self, n = 0):
+        assert (0 <= n < self.Size), "\"n\" must be an existing row of the ledger."
+        row = self.row(n)  # Copiar información de la fila.
+        for values in self.Data.values():  # Correr una fila hacia arriba las siguientes.
+            values[n : self.Size - 1] = values[n + 1 : self.Size]
+        self.Size = self.Size - 1
+        self.Frame = None
+        return row
+
+    ##########################################################################
+    def column(self, label):
+        return self.Data[label][:self.Size]  # Vista, sin copiar.
+
+    ##########################################################################
+    def clear(self):
+        self.Size = 0
+        self.Frame = None
+
+    ##########################################################################
+    def frame(self):
+        if (self.Frame is None):
+            self.Frame = pandas.DataFrame({label: self.column(label).copy()
+                                           for label in self.Columns}).infer_objects()
+        return self.Frame
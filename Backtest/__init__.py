@@ -1 +1,7 @@
-from SIAX.Backtest.Backtesting_Vectorizado import Backtest
\ No newline at end of file
+from SIAX.LazyModule import LazyModule
+
+LazyModule.install(__name__, {
+  'Backtest': 'SIAX.Backtest.Backtesting_Vectorizado',
+  'BacktestSweep': 'SIAX.Backtest.BacktestSweep',
+  'TradeLedger': 'SIAX.Backtest.TradeLedger',
+})
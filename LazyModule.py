@@ -0,0 +1,57 @@
+import importlib
+import sys
+import types
+
+class LazyModule(types.ModuleType):
+  """
+  Paquete que importa sus clases recién cuando se las usa.
+
+  Importar SIAX (o cualquiera de sus subpaquetes) ya no importa todos sus
+  módulos, y con ellos TensorFlow, matplotlib, seaborn, etc. Cada paquete
+  declara qué clase exporta y desde qué módulo, y la primera vez que se pide
+  una (from SIAX.Backtest import Backtest, SIAX.MarketData, import *...) se
+  importa sólo el módulo que la define.
+
+  Como en este repo cada módulo se llama igual que su clase, al importar un
+  módulo Python lo guarda como atributo del paquete, tapando a la clase. Acá
+  se ignora esa asignación, así el paquete sigue devolviendo la clase, igual
+  que cuando los __init__ importaban todo de entrada.
+  """
+
+  @staticmethod
+  def install(name, exports):
+    """
+    Convierte el paquete ya importado 'name' (usar __name__) en perezoso.
+
+    Argumentos:
+    name: nombre completo del paquete.
+    exports: diccionario {clase: módulo que la define}. El módulo puede ser
+             también un subpaquete perezoso que la exporte.
+    """
+    module = sys.modules[name]
+    module.__dict__['_exports'] = dict(exports)
+    module.__dict__['__all__'] = list(exports)
+    module.__class__ = LazyModule
+
+  def __getattr__(self, name):
+
+    exports = self.__dict__.get('_exports', {})
+    if name not in exports:
+      raise AttributeError(f"module '{self.__name__}' has no attribute '{name}'")
+
+    # Importo el módulo que define la clase, y la guardo para no volver a buscarla
+    value = getattr(importlib.import_module(exports[name]), name)
+    self.__dict__[name] = value
+    return value
+
+  def __setattr__(self, name, value):
+
+    # El sistema de imports asigna cada módulo importado al paquete.
+    # Si se llama como una clase exportada, la clase tiene prioridad.
+    if isinstance(value, types.ModuleType) and name in self.__dict__.get('_exports', {}):
+      return
+    super().__setattr__(name, value)
+
+  def __dir__(self):
+
+    return sorted(set(super().__dir__()) | set(self.__dict__.get('_exports', {})))
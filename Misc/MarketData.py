@@ -1,5 +1,3 @@
-from SIAX.NeuralNetworks.WindowGeneratorFactory import WindowGeneratorFactory
-
 class MarketData:
 
   def __init__(self, symbol, frequency, start_date, rows, dataset, col_to_predict = "Close"):
@@ -29,6 +27,8 @@ class MarketData:
     Devuelve dos series de tiempo. Una de training y una de validación.
     El 80% de la serie va a ser de training y el 20 de validación.
     """
+    # Se importa acá para que leer datos del repositorio no cargue TensorFlow
+    from SIAX.NeuralNetworks.WindowGeneratorFactory import WindowGeneratorFactory
 
     return WindowGeneratorFactory.build_multi_input_diff(self.dataset, [self.col_to_predict], window_size, label_width=label_width)
 
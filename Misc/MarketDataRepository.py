@@ -1,7 +1,14 @@
 import os
 import os.path
+import json
+import datetime
+import bisect
+import shutil
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 from SIAX.Misc.MarketData import MarketData
+from SIAX.Misc.MarketDataStream import MarketDataStream
 
 class MarketDataRepository:
   """
@@ -15,14 +22,45 @@ class MarketDataRepository:
   En el constructor es conveniente pasarle el path a una carpeta
   que va a ser usada como cache para sólo bajar datasets que no se hayan
   descargado antes y minimizar el acceso a los repos remotos.
+
+  La cache guarda cada dataset en una carpeta con un archivo .npy por columna
+  (incluida la columna Datetime ya parseada), así se puede leer sólo el rango
+  de filas pedido sin parsear el archivo completo.
+
+  Junto a las columnas se guarda un índice (index.json) con la primera y la
+  última fecha, la cantidad de filas, y el offset y la cantidad de filas de
+  cada mes. Con él se contestan preguntas de disponibilidad sin leer datos.
+
+  Además, los datasets ya leídos quedan en una cache en memoria compartida por
+  todo el proceso, con un presupuesto de bytes y desalojo LRU. Los pedidos con
+  distinto start_date/rows se sirven como copias de slices del mismo DataFrame,
+  así que modificar un dataset devuelto no cambia los siguientes.
   """
 
+  # Cache en memoria del proceso: (source, symbol, frequency) -> DataFrame completo.
+  # El orden es el de uso, el primero es el que se desaloja.
+  _memory = OrderedDict()
+
+  # Presupuesto de bytes de la cache en memoria. Se cambia con set_memory_budget.
+  _memory_budget = 2 * 1024 ** 3
+
+  # Reglas para armar velas de mayor temporalidad a partir de M1.
+  # Son las mismas que MTrack._DColumns y MTrack._TFLabels (ZMQ/MTrack.py).
+  # Semanas y meses no tienen duración fija: se anclan como en MetaTrader,
+  # las semanas al domingo y los meses al día 1 ('MN', 'MN1').
+  _DColumns = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum", "Spread": "max"}
+  _TFLabels = {"S": "seconds", "M": "minutes", "H": "hours", "D": "days"}
+  _TFAnchored = {"W": "W-SUN", "MN": "MS"}
+
   def __init__(self, dataset_cache_url = None):
 
     # La carpeta pasada por parámetro se usa como cache para
     # no bajar múltiples veces el mismo dataset
     self._dataset_cache_url = dataset_cache_url
 
+    # Índices de fechas ya leídos de la cache, por id de archivo
+    self._indexes = {}
+
     # Por ahora, guradamos los datasets en este diccionario.
     # Más adelante podríamos guardar un csv que sirva de índice y
     # contenga toda esta información.
@@ -56,7 +94,7 @@ class MarketDataRepository:
       ('DUMMY'    ,'SENO'    ,'M1'): '1BZN5NEVoRkLJpGjEADwFcRwCFYoCHldF'
     }
 
-  def get_dataset(self, symbol, frequency = 'M1', start_date = '2016-09-01', rows = None, source = 'ICMarkets'):
+  def get_dataset(self, symbol, frequency = 'M1', start_date = '2016-09-01', rows = None, source = 'ICMarkets', mmap = False):
     """
     Devuelve un dataset filtrado según los parámetros.
     Para obtener los posibles valores que se le pueden pasar, llamar al método
@@ -64,29 +102,45 @@ class MarketDataRepository:
 
     Argumentos:
     symbol: símbolo para el cual se requiere la información.
-    frequency: por ahora sólo puede ser 'M1', luego podemos armar velas
-               de frecuencias menores.
+    frequency: cualquier temporalidad de MetaTrader ('M1', 'M5', 'H1', 'H4', 'D1', 'W1', 'MN1', etc.).
+               Las que no son 'M1' se arman a partir de M1 la primera vez y se
+               guardan en la cache, al lado del archivo de M1.
     start_date: fecha desde la cual se requiere la información.
     rows: cantidad de filas a pedir. Se recomienda no usar el dataset
-          completo porque tiene millones de filas
+          completo porque tiene millones de filas. Si el dataset está en la
+          cache, se chequea con su índice que alcancen antes de leer nada.
     source: por defecto es ICMarkets. Para usar alguno de los datasets dummy,
             usar el source DUMMY
+    mmap: si es True, las columnas del dataset quedan mapeadas en memoria sobre
+          los archivos de la cache (sólo lectura) en vez de copiarse a RAM.
+          Los slices por fecha son vistas, y varios procesos que abren el mismo
+          dataset comparten las mismas páginas. Requiere carpeta de cache.
     """    
 
     # Armo la clave para ir a buscar al diccionario
     key = (source, symbol, frequency)
 
-    # Si la clave no está, no puedo seguir
-    assert key in self._datasets, "No se encuentra el dataset"
+    # Sin cache no hay archivos sobre los cuales mapear la memoria
+    assert self._dataset_cache_url or not mmap, "mmap requiere una carpeta de cache"
 
-    # Obtengo el id del archivo desde el diccionario
-    csv_file = self._datasets[key]
+    # Obtengo el id del archivo desde el diccionario. Si la clave no está,
+    # no puedo seguir
+    csv_file = self._get_file_id(source, symbol, frequency)
 
-    # Obtengo el archivo usando un método privado de la clase
-    data = self._get_file(csv_file)
+    # Si el dataset ya está en la cache, chequeo con el índice que haya
+    # suficientes datos antes de leer nada
+    if self._is_cached(csv_file):
+      available = self._index_count(csv_file, start_date)
+      assert (rows or 0) <= available, "No hay suficientes datos para devolver"
 
-    # Me quedo con las filas desde start_data en adelante
-    data = data.loc[start_date:]
+    # Primero busco en la cache en memoria del proceso (salvo con mmap,
+    # que ya comparte las páginas de los archivos)
+    data = None if mmap else self._get_from_memory(key, csv_file, start_date, rows)
+
+    # Si no, obtengo las filas desde start_date en adelante usando un método
+    # privado de la clase. Si se pidió una cantidad de filas, sólo lee esas.
+    if data is None:
+      data = self._get_file(csv_file, start_date, rows, mmap)
 
     rows = rows if rows else data.shape[0]
 
@@ -102,30 +156,269 @@ class MarketDataRepository:
     return MarketData(symbol, frequency, start_date, rows, data)
 
 
-  def get_available_dataset_list(self, source='ICMarkets'):
+  def get_available_dataset_list(self, source='ICMarkets', coverage = False):
     """
     Devuelve el listado de (símbolo, frecuencia) disponibles para la fuente solicitada.
+    Si coverage es True, devuelve (símbolo, frecuencia, primera fecha, última fecha, filas)
+    según el índice de la cache. Los datasets que no están en la cache van con None.
     """
 
     # La key del diccionario está formada por source, symbol y frequency,
     # pero sólo devolvemos el símbolo y la frecuencia
     # ya que la fuente fue pasada por parámetro
-    return [(symbol, frequency)
-            for src, symbol, frequency
-            in self._datasets.keys()
-            if src == source]
+    datasets = [(symbol, frequency)
+                for src, symbol, frequency
+                in self._datasets.keys()
+                if src == source]
+
+    if not coverage:
+      return datasets
+
+    return [(symbol, frequency) + self._coverage(self._datasets[(source, symbol, frequency)])
+            for symbol, frequency in datasets]
+
+
+  def get_available_rows(self, symbol, frequency = 'M1', start_date = None, end_date = None, source = 'ICMarkets'):
+    """
+    Devuelve cuántas filas hay desde start_date y antes de end_date,
+    usando sólo el índice de la cache, sin leer los datos.
+    Si el dataset todavía no está en la cache, devuelve None.
+    """
+    csv_file = self._get_file_id(source, symbol, frequency)
+
+    if not self._is_cached(csv_file):
+      return None
+
+    # Filas desde start_date, menos las filas desde end_date
+    available = self._index_count(csv_file, start_date)
+
+    if end_date:
+      available -= self._index_count(csv_file, end_date)
+
+    return max(0, available)
+
+
+  def get_dataset_chunks(self, symbol, frequency = 'M1', start_date = '2016-09-01', end_date = None, chunk_rows = 1000000, overlap = 0, source = 'ICMarkets'):
+    """
+    Generador que recorre el dataset desde start_date (y antes de end_date)
+    en DataFrames de a chunk_rows filas, sin cargarlo entero en memoria: cada
+    bloque se lee de la cache por columnas recién cuando se lo pide.
+
+    Argumentos:
+    overlap: cada bloque empieza con las últimas 'overlap' filas del anterior,
+             para que lo que necesite filas previas (diferencias, ventanas)
+             pueda continuar donde terminó el bloque anterior.
+    El resto de los argumentos son los de get_dataset. Requiere carpeta de
+    cache: si el dataset todavía no está, se baja y se guarda primero.
+    """
+    assert self._dataset_cache_url, "Leer por bloques requiere una carpeta de cache"
+    assert chunk_rows > 0, "chunk_rows tiene que ser mayor a 0"
+
+    csv_file = self._get_file_id(source, symbol, frequency)
+
+    # La primera vez lo guardo en la cache (o armo la temporalidad desde M1)
+    if not self._is_cached(csv_file):
+      self._get_file(csv_file)
+
+    first = self._index_first_row(csv_file, start_date)
+    last = self._index_first_row(csv_file, end_date) if end_date else self._read_index(csv_file)['rows']
+
+    for start in range(first, last, chunk_rows):
+      yield self._read_rows(csv_file, max(first, start - overlap), min(last, start + chunk_rows))
+
+
+  def get_dataset_stream(self, symbols, frequency = 'M1', start_date = '2016-09-01', end_date = None, chunk_rows = 1000000, source = 'ICMarkets'):
+    """
+    Devuelve un MarketDataStream: como un MarketData, pero que en vez de tener
+    el dataset en memoria lo lee por bloques, para uno o varios símbolos.
+    Se usa para entrenar con más datos de los que entran en memoria (ver
+    TrainingSession). Los argumentos son los de get_dataset_chunks.
+    """
+    symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+
+    # Me aseguro de que todos estén en la cache, para saber cuántas filas hay
+    for symbol in symbols:
+      csv_file = self._get_file_id(source, symbol, frequency)
+      if not self._is_cached(csv_file):
+        assert self._dataset_cache_url, "Leer por bloques requiere una carpeta de cache"
+        self._get_file(csv_file)
+
+    rows = sum(self.get_available_rows(symbol, frequency, start_date, end_date, source) for symbol in symbols)
+
+    return MarketDataStream(self, symbols, frequency, start_date, end_date, rows, chunk_rows, source)
+
+
+  def _get_file_id(self, source, symbol, frequency):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Devuelve el id del archivo del dataset. Las temporalidades que no están en
+    el diccionario se arman desde M1, y su id es '<id de M1>.<frecuencia>'.
+    """
+    key = (source, symbol, frequency)
+
+    if key in self._datasets:
+      return self._datasets[key]
+
+    assert (source, symbol, 'M1') in self._datasets, "No se encuentra el dataset"
+    assert self._frequency_rule(frequency), "La frecuencia debe ser una temporalidad de MetaTrader (ej.: 'M5', 'H4', 'W1', 'MN1')"
+
+    return self._datasets[(source, symbol, 'M1')] + '.' + frequency
+
+
+  @staticmethod
+  def _frequency_rule(frequency):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Convierte una temporalidad de MetaTrader (ej.: 'H4') en los argumentos
+    de DataFrame.resample. Las semanas empiezan el domingo y los meses el
+    día 1, y cada vela se etiqueta con su inicio. Devuelve None si no es válida.
+    """
+    letters = 'MN' if frequency.startswith('MN') else frequency[:1]
+
+    try:
+      N = int(frequency[len(letters):] or (1 if letters == 'MN' else ''))
+    except ValueError:
+      return None
+
+    if N <= 0:
+      return None
+
+    if letters in MarketDataRepository._TFAnchored:
+      return {'rule': f'{N}{MarketDataRepository._TFAnchored[letters]}', 'closed': 'left', 'label': 'left'}
+
+    if letters in MarketDataRepository._TFLabels:
+      return {'rule': datetime.timedelta(**{MarketDataRepository._TFLabels[letters]: N})}
+
+    return None
+
+
+  @staticmethod
+  def _reframe(frequency, data):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Arma velas de la temporalidad pedida a partir de velas de menor
+    temporalidad, como MTrack._reframe. Las columnas que no están en
+    _DColumns se quedan con el último valor. Se descartan los intervalos
+    sin velas (fines de semana, feriados).
+    """
+    rules = {column: MarketDataRepository._DColumns.get(column, "last") for column in data.columns}
+
+    resampler = data.resample(**MarketDataRepository._frequency_rule(frequency))
+
+    return resampler.agg(rules)[resampler.size() > 0]
+
+
+  @staticmethod
+  def set_memory_budget(memory_budget):
+    """
+    Cambia el presupuesto en bytes de la cache en memoria del proceso
+    y desaloja los datasets menos usados hasta entrar en él.
+    Con 0 se desactiva la cache.
+    """
+    MarketDataRepository._memory_budget = memory_budget
+    MarketDataRepository._evict()
+
+
+  @staticmethod
+  def clear_memory():
+    """
+    Vacía la cache en memoria del proceso.
+    """
+    MarketDataRepository._memory.clear()
+
+
+  @staticmethod
+  def _evict():
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Desaloja los datasets usados hace más tiempo hasta entrar en el presupuesto.
+    """
+    memory = MarketDataRepository._memory
+
+    while memory and sum(MarketDataRepository._memory_size(data) for data in memory.values()) > MarketDataRepository._memory_budget:
+      memory.popitem(last = False)
+
+
+  @staticmethod
+  def _memory_size(data):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Bytes que ocupa un DataFrame, con su índice.
+    """
+    return int(data.memory_usage(index = True).sum())
+
+
+  def _get_from_memory(self, key, csv_file, start_date, rows):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Devuelve una copia de las filas pedidas del dataset completo guardado en
+    la cache en memoria. Si no estaba, lo lee completo y lo guarda, salvo que no
+    entre en el presupuesto: en ese caso devuelve None y se lee sólo el rango.
+    """
+    memory = MarketDataRepository._memory
+
+    if key not in memory:
+
+      # Si está en la cache en disco, estimo su tamaño con el índice antes de leerlo
+      if self._is_cached(csv_file):
+        with open(os.path.join(self._columns_folder(csv_file), 'columns.json')) as json_file:
+          columns = json.load(json_file)
+
+        if self._read_index(csv_file)['rows'] * 8 * (len(columns) + 1) > MarketDataRepository._memory_budget:
+          return None
+
+      data = self._get_file(csv_file)
+
+      if self._memory_size(data) > MarketDataRepository._memory_budget:
+        return self._slice(data, start_date, rows)
+
+      memory[key] = data
+      MarketDataRepository._evict()
 
+    # Lo marco como el último usado
+    memory.move_to_end(key)
 
+    # Copio el slice: si se modifica in place, la cache no tiene que cambiar
+    return self._slice(memory[key], start_date, rows).copy()
 
-  def _get_file(self, csv_file):
+
+  @staticmethod
+  def _slice(data, start_date, rows):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Las filas desde start_date en adelante ('rows' filas si se pasa).
+    """
+    data = data.loc[start_date:]
+
+    return data.head(rows) if rows else data
+
+
+  def _get_file(self, csv_file, start_date = None, rows = None, mmap = False):
     """
     Este método es PRIVADO. No llamalo desde afuera.
-    Devuelve el archivo solicitado teniendo en cuenta la cache local.
+    Devuelve las filas del archivo solicitado desde start_date en adelante
+    (sólo 'rows' filas si se pasa), teniendo en cuenta la cache local.
+    Con mmap, las columnas quedan mapeadas sobre los archivos de la cache.
     Si hay una carpeta de cache configurada, primero chequea ahí.
     Si no está, busca el archivo en drive.
-    Si hay carpeta de cache configurada, guarda el archivo ahí.
+    Si hay carpeta de cache configurada, guarda el archivo ahí en columnas.
     """
 
+    # Si ya está en la cache por columnas, leo sólo el rango pedido
+    if self._is_cached(csv_file):
+      return self._read_columns(csv_file, start_date, rows, mmap)
+
+    # Las temporalidades mayores se arman desde M1 y se guardan en la cache
+    if '.' in csv_file:
+      m1_file, frequency = csv_file.split('.')
+      data = self._reframe(frequency, self._get_file(m1_file))
+
+      if self._dataset_cache_url:
+        self._write_columns(csv_file, data)
+        return self._read_columns(csv_file, start_date, rows, mmap)
+
+      return self._slice(data, start_date, rows)
+
     # Armo el nombre del archivo dentro de la carpeta para cache de archivos
     if self._dataset_cache_url:
 
@@ -135,21 +428,208 @@ class MarketDataRepository:
 
       cached_file_name = self._dataset_cache_url + '/' + csv_file + '.csv'
 
-    # Si tengo cache y además un archivo con el nombre correspondiente
+    # Si tengo cache y además un csv de una versión anterior de la cache
     if self._dataset_cache_url and os.path.isfile(cached_file_name):
 
       # Leo el archivo desde esa carpeta local
-      data = pd.read_csv(cached_file_name, index_col = "Datetime")
+      data = pd.read_csv(cached_file_name, index_col = "Datetime", parse_dates = True)
 
     else:
       # Si no, lo leo de drive
       link = "https://drive.google.com/uc?id=" + csv_file
-      data = pd.read_csv(link, index_col = "Datetime")
+      data = pd.read_csv(link, index_col = "Datetime", parse_dates = True)
+
+    # Si tengo cache, lo guardo por columnas para las próximas lecturas
+    # y borro el csv viejo si existía
+    if self._dataset_cache_url:
+      self._write_columns(csv_file, data)
+
+      if os.path.isfile(cached_file_name):
+        os.remove(cached_file_name)
+
+      # Si se pidió mmap, el dataset tiene que salir de los archivos recién escritos
+      if mmap:
+        return self._read_columns(csv_file, start_date, rows, mmap)
+
+    # Me quedo con las filas desde start_date en adelante
+    return self._slice(data, start_date, rows)
+
+
+  def _is_cached(self, csv_file):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Indica si el dataset ya está guardado por columnas en la cache.
+    """
+    return bool(self._dataset_cache_url) and os.path.isdir(self._columns_folder(csv_file))
+
+
+  def _coverage(self, csv_file):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Devuelve (primera fecha, última fecha, filas) según el índice de la cache.
+    """
+    if not self._is_cached(csv_file):
+      return (None, None, None)
+
+    index = self._read_index(csv_file)
+
+    return (pd.Timestamp(index['first']), pd.Timestamp(index['last']), index['rows'])
+
+
+  def _build_index(self, times):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Arma el índice de un dataset a partir de su columna Datetime ordenada:
+    primera y última fecha, filas totales y [offset, filas] de cada mes.
+    """
+    months, offsets, counts = np.unique(np.asarray(times).astype('datetime64[M]'),
+                                        return_index = True, return_counts = True)
+
+    return {'first': str(times[0]) if len(times) else None,
+            'last': str(times[-1]) if len(times) else None,
+            'rows': int(len(times)),
+            'months': {str(month): [int(offset), int(count)]
+                       for month, offset, count in zip(months, offsets, counts)}}
+
+
+  def _read_index(self, csv_file):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Devuelve el índice de fechas del dataset. Si la cache es de antes de que
+    existieran los índices, lo arma desde la columna Datetime y lo guarda.
+    """
+    if csv_file not in self._indexes:
+      path = os.path.join(self._columns_folder(csv_file), 'index.json')
+
+      if not os.path.isfile(path):
+        times = np.load(os.path.join(self._columns_folder(csv_file), 'Datetime.npy'), mmap_mode = 'r')
+
+        with open(path, 'w') as json_file:
+          json.dump(self._build_index(times), json_file)
+
+      with open(path) as json_file:
+        self._indexes[csv_file] = json.load(json_file)
+
+    return self._indexes[csv_file]
+
+
+  def _index_first_row(self, csv_file, start_date = None):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Devuelve el número de la primera fila desde start_date en adelante.
+    El índice dice en qué mes cae, y sólo se busca dentro de las filas de ese mes.
+    """
+    index = self._read_index(csv_file)
+
+    if not start_date:
+      return 0
+
+    start = np.datetime64(pd.Timestamp(start_date), 'ns')
+    months = list(index['months'].keys())
+
+    # Primer mes que no es anterior al de start_date (los meses 'YYYY-MM' se ordenan como strings)
+    n = bisect.bisect_left(months, str(start.astype('datetime64[M]')))
+
+    if n == len(months):
+      return index['rows']
+
+    offset, count = index['months'][months[n]]
+
+    # Si start_date cae dentro de ese mes, busco la fila exacta sólo en ese bloque
+    if months[n] == str(start.astype('datetime64[M]')):
+      times = np.load(os.path.join(self._columns_folder(csv_file), 'Datetime.npy'), mmap_mode = 'r')
+      offset += int(np.searchsorted(times[offset : offset + count], start, 'left'))
+
+    return offset
+
+
+  def _index_count(self, csv_file, start_date = None):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Cantidad de filas desde start_date hasta el final del dataset.
+    """
+    return self._read_index(csv_file)['rows'] - self._index_first_row(csv_file, start_date)
+
+
+  def _columns_folder(self, csv_file):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Carpeta de la cache donde se guardan las columnas de un dataset.
+    """
+    return os.path.join(self._dataset_cache_url, csv_file)
+
+
+  def _write_columns(self, csv_file, data):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Guarda el dataset en la cache como un .npy por columna, más un json
+    con el orden de las columnas. Escribe en una carpeta temporal y la
+    renombra al final, para no dejar una cache a medio escribir.
+    """
+    folder = self._columns_folder(csv_file)
+    temporary = folder + '.tmp'
+
+    if os.path.exists(temporary):
+      shutil.rmtree(temporary)
+    os.makedirs(temporary)
+
+    # El índice se guarda ya parseado como fechas
+    np.save(os.path.join(temporary, 'Datetime.npy'), data.index.values.astype('datetime64[ns]'))
+
+    for column in data.columns:
+      np.save(os.path.join(temporary, column + '.npy'), data[column].values)
+
+    with open(os.path.join(temporary, 'columns.json'), 'w') as json_file:
+      json.dump(list(data.columns), json_file)
+
+    # Índice de fechas para contestar disponibilidad sin leer los datos
+    with open(os.path.join(temporary, 'index.json'), 'w') as json_file:
+      json.dump(self._build_index(data.index.values.astype('datetime64[ns]')), json_file)
+
+    os.replace(temporary, folder)
+    self._indexes.pop(csv_file, None)
+
+
+  def _read_columns(self, csv_file, start_date = None, rows = None, mmap = False):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Lee de la cache por columnas sólo las filas desde start_date en adelante
+    (y sólo 'rows' filas si se pasa). Los .npy se abren mapeados en memoria,
+    así que del disco sólo se lee el rango pedido.
+    Con mmap no se copia nada: cada columna del DataFrame es una vista de
+    sólo lectura sobre su archivo, y pandas no las junta en un único bloque.
+    """
+    folder = self._columns_folder(csv_file)
+
+    with open(os.path.join(folder, 'columns.json')) as json_file:
+      columns = json.load(json_file)
+
+    # Busco la primera fila desde start_date usando el índice de meses
+    times = np.load(os.path.join(folder, 'Datetime.npy'), mmap_mode = 'r')
+    first = self._index_first_row(csv_file, start_date)
+    last = min(len(times), first + rows) if rows else len(times)
+
+    return self._read_rows(csv_file, first, last, mmap, columns)
+
+
+  def _read_rows(self, csv_file, first, last, mmap = False, columns = None):
+    """
+    Este método es PRIVADO. No llamalo desde afuera.
+    Lee de la cache por columnas las filas [first, last).
+    """
+    folder = self._columns_folder(csv_file)
+
+    if columns is None:
+      with open(os.path.join(folder, 'columns.json')) as json_file:
+        columns = json.load(json_file)
+
+    times = np.load(os.path.join(folder, 'Datetime.npy'), mmap_mode = 'r')
 
-    # Si tengo cache pero aun no se guardó este archivo
-    if self._dataset_cache_url and not os.path.isfile(cached_file_name):
+    # Sin mmap copio el rango a RAM, con mmap me quedo con la vista
+    load = (lambda array: array) if mmap else np.array
 
-      # Lo guardo en el mismo lugar donde antes chequeé si existía
-      data.to_csv(cached_file_name)
+    index = pd.DatetimeIndex(load(times[first:last]), name = 'Datetime')
+    data = {column: load(np.load(os.path.join(folder, column + '.npy'), mmap_mode = 'r')[first:last])
+            for column in columns}
 
-    return data
\ No newline at end of file
+    return pd.DataFrame(data, index = index, columns = columns, copy = not mmap)
@@ -0,0 +1,62 @@
+class MarketDataStream:
+  """
+  Como MarketData, pero sin el dataset en memoria: lo lee por bloques desde
+  la cache de un MarketDataRepository, uno o varios símbolos seguidos.
+  Se obtiene con MarketDataRepository.get_dataset_stream.
+  """
+
+  def __init__(self, repository, symbols, frequency, start_date, end_date, rows, chunk_rows, source = 'ICMarkets', col_to_predict = "Close"):
+    self.repository = repository
+    self.symbols = symbols
+    self.symbol = ",".join(symbols)
+    self.frequency = frequency
+    self.start_date = start_date
+    self.end_date = end_date
+    self.rows = rows
+    self.chunk_rows = chunk_rows
+    self.source = source
+    self.col_to_predict = col_to_predict
+
+  def chunks(self, overlap = 0, interleave = False):
+    """
+    Generador de DataFrames de a lo sumo chunk_rows filas nuevas cada uno.
+    Dentro de cada símbolo, cada bloque empieza con las últimas 'overlap'
+    filas del anterior. Entre símbolos no hay solapamiento, así que nada
+    de lo que se arme con un bloque mezcla datos de dos símbolos.
+    Con interleave, los bloques de los símbolos se alternan (uno de cada
+    símbolo por vuelta) en lugar de recorrer un símbolo entero tras otro.
+    """
+    streams = [self.repository.get_dataset_chunks(symbol, self.frequency, self.start_date, self.end_date,
+                                                  self.chunk_rows, overlap, self.source)
+               for symbol in self.symbols]
+
+    if not interleave:
+      for stream in streams:
+        yield from stream
+      return
+
+    # Cada símbolo sigue su propio generador, así que el solapamiento no cambia
+    while streams:
+      for stream in list(streams):
+        chunk = next(stream, None)
+        if chunk is None:
+          streams.remove(stream)
+        else:
+          yield chunk
+
+  def describe(self):
+    """
+    Devuelve un string con la descripción de la metadata
+    """
+    until = ". Hasta " + self.end_date if self.end_date else ""
+
+    return self.symbol + " con frecuencia " + self.frequency +\
+          ". Desde " + self.start_date + until + ". " + str(self.rows) + " filas, leídas de a " +\
+          str(self.chunk_rows) + "."
+
+  def summary(self):
+    """
+    Devuelve la información sumarizada para ser insertada en una tabla
+    """
+
+    return f"{self.symbol}|{self.frequency}|{self.start_date}|{self.rows}"
@@ -1,3 +1,8 @@
-# Market Data
-from SIAX.Misc.MarketData import MarketData
-from SIAX.Misc.MarketDataRepository import MarketDataRepository
\ No newline at end of file
+from SIAX.LazyModule import LazyModule
+
+LazyModule.install(__name__, {
+  # Market Data
+  'MarketData': 'SIAX.Misc.MarketData',
+  'MarketDataRepository': 'SIAX.Misc.MarketDataRepository',
+  'MarketDataStream': 'SIAX.Misc.MarketDataStream',
+})
@@ -29,6 +29,19 @@ class ModelBase():
   def call(self, inputs):
     return self.model(inputs)
   
+  def predict(self, inputs):
+    """
+    Predice todo un dataset (o array) de una vez con `model.predict`,
+    que arma un único array con la predicción de cada batch.
+    """
+    return self.model.predict(inputs, verbose=0)
+
+  def predict_on_batch(self, inputs):
+    """
+    Predice un solo batch de ventanas y devuelve un array de numpy.
+    """
+    return self.model.predict_on_batch(inputs)
+
   def evaluate(self, inputs_labels):
     return self.model.evaluate(inputs_labels)
 
@@ -11,7 +11,7 @@ from SIAX.PreProcessing.PreProcessor import PreProcessor
 
 class NeuralNetworkStrategy:
 
-  def __init__(self, model, pre_processor = PreProcessor(), OHLC = "Close"):
+  def __init__(self, model, pre_processor = PreProcessor(), OHLC = "Close", precompute = False, batch_size = 4096):
     """
       Se puede heredar de esta clase y sobreescribirle cualquiera de los
       siguientes métodos:
@@ -20,6 +20,17 @@ class NeuralNetworkStrategy:
       * calculate_stop_loss: Cómo setear el Stop Loss
       * calculate_take_profit: Cómo setear el Take Profit
       * calculate_indicators: Cómo obtener indicadores
+
+      Si precompute es True, antes de correr el backtest (método prepare)
+      se arman todas las ventanas del dataset y se predicen en batches de
+      batch_size. En cada vela sólo se busca la predicción ya calculada.
+
+      Si el pre procesador se puede compilar (ver PreProcessor.compile),
+      cuando rows es la ventana anterior corrida una vela sólo se pre
+      procesa la vela nueva, en lugar de la ventana completa. Esto sólo
+      se hace si el pre procesador no lee ninguna columna que el backtest
+      escriba después de llamar a call ("$", "Delays" y los indicadores),
+      porque las velas anteriores no se vuelven a leer.
     """
 
     self.model = model
@@ -27,6 +38,23 @@ class NeuralNetworkStrategy:
     self.Indicators = []
     self.OHLC = OHLC
     self.pre_processor = pre_processor
+    self.precompute = precompute
+    self.batch_size = batch_size
+
+    # Predicciones precalculadas y el índice de la vela a la que corresponden
+    self._predictions = None
+    self._predictions_index = None
+
+    # Pre procesador compilado, las columnas para las que se compiló
+    # (False si no se puede compilar), si se puede actualizar de a una vela
+    # y la última ventana que procesó
+    self._compiled = None
+    self._compiled_columns = None
+    self._incremental = False
+    self._last_rows = None
+
+  # Columnas que el backtest escribe en una vela después de pasarla por call
+  _backtest_columns = ["$", "Delays"]
 
 
   def call(self, rows):
@@ -36,9 +64,12 @@ class NeuralNetworkStrategy:
 
     OT = OP = Type = Lot = SL = TP = None  ## Default: None.
 
-    processed_rows = self._pre_process_rows(rows)
+    prediction = self._cached_prediction(rows)
 
-    prediction = self.model.call(processed_rows)
+    if prediction is None:
+      processed_rows = self._pre_process_rows(rows)
+
+      prediction = self.model.call(processed_rows)
 
     Type = self.calculate_type_of_operation(prediction)
 
@@ -56,21 +87,134 @@ class NeuralNetworkStrategy:
 
     return Indicators, Signal
 
+  def prepare(self, dataset):
+    """
+    Lo llama el Backtest antes de empezar a recorrer el dataset.
+    En modo precompute calcula todas las predicciones de una vez.
+    """
+    if self.precompute:
+      self.precompute_predictions(dataset)
+
+  def precompute_predictions(self, dataset):
+    """
+    Arma todas las ventanas que recibiría call sobre el dataset y las predice
+    en batches grandes. La predicción de la fila nr queda guardada para la
+    ventana dataset.iloc[nr - minRows : nr + 1].
+    """
+    # Predigo de a batches grandes en lugar de una ventana por vela
+    predictions = [np.asarray(self.model.call(batch)) for batch in self._window_batches(dataset)]
+
+    # Si el dataset no llega a tener una ventana completa no hay predicciones
+    self._predictions = np.concatenate(predictions) if predictions else np.empty(0, dtype = np.float32)
+    self._predictions_index = dataset.index[self.minRows:]
+
+  def _window_batches(self, dataset):
+    """
+    Genera las ventanas del dataset en batches de batch_size, listos para
+    model.call. Pre procesa el dataset completo una sola vez y corta las
+    ventanas como vistas de un único array. Si el pre procesador no da lo
+    mismo que aplicarlo ventana por ventana (por ejemplo si normaliza por
+    ventana), se usa el camino lento: pre procesar cada ventana por separado,
+    armando un batch por vez para no tener todas las ventanas en memoria.
+    """
+    rows = self.minRows + 1
+    count = len(dataset) - self.minRows
+
+    if count <= 0:
+      return
+
+    # Ventanas tal como las arma _pre_process_rows, para la primera y la última vela
+    first = np.array(self.pre_processor(dataset.iloc[: rows]), dtype = np.float32)
+    last = np.array(self.pre_processor(dataset.iloc[-rows :]), dtype = np.float32)
+
+    # Pre proceso el dataset completo y alineo las ventanas por su última fila
+    processed = np.array(self.pre_processor(dataset), dtype = np.float32)
+    if len(processed) >= len(first):
+      windows = np.lib.stride_tricks.sliding_window_view(processed, len(first), axis = 0)
+      windows = np.moveaxis(windows, -1, 1)[-count:]
+
+      same_shape = (windows.shape == (count,) + first.shape)
+      if same_shape and np.allclose(windows[0], first) and np.allclose(windows[-1], last):
+        for i in range(0, count, self.batch_size):
+          yield np.ascontiguousarray(windows[i : i + self.batch_size])
+        return
+
+    for start in range(self.minRows, len(dataset), self.batch_size):
+      yield np.stack([np.array(self.pre_processor(dataset.iloc[nr - self.minRows : nr + 1]), dtype = np.float32)
+                      for nr in range(start, min(start + self.batch_size, len(dataset)))])
+
+  def _cached_prediction(self, rows):
+    """
+    Devuelve la predicción precalculada para la última fila de rows, con un
+    batch de tamaño 1 como la de model.call. Si no hay, devuelve None.
+    """
+    if self._predictions is None:
+      return None
+
+    try:
+      n = self._predictions_index.get_loc(rows.index[-1])
+    except KeyError:
+      return None
+
+    return self._predictions[n : n + 1]
+
   def _pre_process_rows(self, rows):
     """
     Este método no se debería sobreescribir. Recibe las rows y se le aplica
     el pre procesamiento que se recibió en el constructor
     """
-    # Llamo al pre procesador
-    processed_rows = self.pre_processor(rows)
+    compiled = self._compiled_pre_processor(rows)
+
+    if compiled is None:
+
+      # Llamo al pre procesador
+      processed_rows = self.pre_processor(rows)
 
-    # Convierto la salida en un array de numpy
-    processed_rows = np.array(processed_rows)
+      # Convierto la salida en un array de numpy
+      processed_rows = np.array(processed_rows)
+
+    # Si rows es la ventana anterior corrida una vela, sólo proceso la vela nueva
+    elif self._incremental and self._last_rows is not None and len(rows) == self._last_rows[0] and len(rows) > 1 and rows.index[-2] == self._last_rows[1]:
+      processed_rows = compiled.update(rows)
+
+    else:
+      processed_rows = compiled.reset(rows)
+
+    if compiled is not None:
+      self._last_rows = (len(rows), rows.index[-1])
 
     # Le agrego una dimensión al principio porque sólo quiero una predicción
     # y no un batch completo
     return tf.expand_dims(processed_rows,0)
 
+  def _compiled_pre_processor(self, rows):
+    """
+    Devuelve el pre procesador compilado para las columnas de rows, o None si
+    no se puede compilar. La primera vez se compara su resultado con el del
+    pre procesador sobre rows, y si no da lo mismo no se usa.
+    """
+    if self._compiled_columns is None or not rows.columns.equals(self._compiled_columns):
+      self._compiled_columns = rows.columns
+      self._last_rows = None
+      self._compiled = self.pre_processor.compile(rows.columns) or False
+
+      if self._compiled:
+        try:
+          expected = np.array(self.pre_processor(rows), dtype = np.float64)
+          compiled = self._compiled(rows)
+          same = (expected.shape == compiled.shape) and np.allclose(expected, compiled)
+        except (ValueError, TypeError):
+          same = False
+
+        if not same:
+          self._compiled = False
+
+      # Si lee columnas que se escriben después de call, las velas ya procesadas quedan viejas
+      written = set(self._backtest_columns) | set(self.Indicators)
+      self._incremental = bool(self._compiled) and not (set(self._compiled.inputs) & written)
+
+    return self._compiled or None
+
   def calculate_type_of_operation(self, prediction):
     """
     En base a la predicción, devuelve el tipo de operación a realizar.
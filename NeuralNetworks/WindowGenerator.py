@@ -2,13 +2,21 @@ import numpy as np
 import tensorflow as tf
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+from numpy.lib.stride_tricks import sliding_window_view
 
 class WindowGenerator():
 
-  def __init__(self, df, input_width, label_width=1, shift=1, label_columns=['Close'], batch_size=32, data_splitter=None):
+  def __init__(self, df, input_width, label_width=1, shift=1, label_columns=['Close'], batch_size=32, data_splitter=None,
+               val_df=None, test_df=None, cache=None):
+    """
+    `train`, `val` and `test` datasets are built once, on first access.
+    `val_df` and `test_df` are used when there is no `data_splitter`.
+    `cache`: None to build every batch on every epoch, '' to cache the
+    batches in memory, or a path prefix to cache them on disk.
+    """
 
     # The dataframe needs to be split
-    train_df, val_df, test_df = data_splitter(df) if data_splitter else df, None, None
+    train_df, val_df, test_df = data_splitter(df) if data_splitter else (df, val_df, test_df)
 
     # Store the raw data.
     self.train_df = train_df
@@ -39,6 +47,10 @@ class WindowGenerator():
 
     self.batch_size = batch_size
 
+    # Datasets already built, by name
+    self.cache = cache
+    self._datasets = {}
+
   def __repr__(self):
     return '\n'.join([
         f'Total window size: {self.total_window_size}',
@@ -89,34 +101,177 @@ class WindowGenerator():
   
     plt.xlabel(time_col)
   
-  def make_dataset(self, data, shuffle=True):
-    data = np.array(data, dtype=np.float32)
-    ds = tf.keras.preprocessing.timeseries_dataset_from_array(
-        data=data,
-        targets=None,
-        sequence_length=self.total_window_size,
-        sequence_stride=1,
-        shuffle=shuffle,
-        batch_size=self.batch_size,)
-  
-    ds = ds.map(self.split_window)
-  
-    return ds
+  def make_windows(self, data):
+    """
+    Returns every `inputs, labels` window of `data` (one per row, stride 1)
+    as strided views over a single float32 buffer, without copying them.
+    `inputs` has shape (windows, input_width, features) and `labels`
+    (windows, label_width, features): the `label_columns` are picked
+    when each batch is gathered (see `make_dataset`).
+    """
+    # Only copies when the data is not a float32 array already
+    if hasattr(data, 'to_numpy'):
+      data = data.to_numpy(dtype=np.float32)
+    data = np.ascontiguousarray(data, dtype=np.float32)
+
+    # (windows, features, total_window_size) -> (windows, total_window_size, features)
+    windows = sliding_window_view(data, self.total_window_size, axis=0)
+    windows = windows.transpose(0, 2, 1)
+
+    return windows[:, self.input_slice, :], windows[:, self.labels_slice, :]
+
+  def label_selection(self):
+    """
+    Index of the `label_columns` in the last axis of the windows: a slice
+    when they are contiguous, so selecting them does not copy.
+    """
+    if self.label_columns is None:
+      return slice(None)
+    columns = [self.column_indices[name] for name in self.label_columns]
+    if columns == list(range(columns[0], columns[-1] + 1)):
+      return slice(columns[0], columns[-1] + 1)
+    return columns
+
+  def make_labels(self, data):
+    """
+    Labels of every window of `data`, in order, with shape
+    (windows, label_width, label columns). Reads them straight from the
+    data, without building the dataset.
+    """
+    _, labels = self.make_windows(data)
+    return labels[:, :, self.label_selection()]
+
+  def make_dataset(self, data, shuffle=True, cache=None):
+    """
+    `tf.data` pipeline of `inputs, labels` batches of `data`.
+    With `cache` ('' for memory, or a file path) batches are only built
+    in the first epoch. From then on, shuffling reorders whole batches.
+    """
+    inputs, labels = self.make_windows(data)
+
+    label_columns = self.label_selection()
+    label_count = inputs.shape[-1] if self.label_columns is None else len(self.label_columns)
+
+    def gather(indices):
+      # Only the windows of this batch are materialized
+      return inputs[indices], np.ascontiguousarray(labels[indices][:, :, label_columns])
+
+    def split_batch(indices):
+      batch_inputs, batch_labels = tf.numpy_function(
+          gather, [indices], [tf.float32, tf.float32])
+
+      # numpy_function loses the static shapes, so set them again.
+      batch_inputs.set_shape([None, self.input_width, inputs.shape[-1]])
+      batch_labels.set_shape([None, self.label_width, label_count])
+
+      return batch_inputs, batch_labels
+
+    # The dataset only holds window indices: shuffling and batching them is cheap
+    ds = tf.data.Dataset.range(len(inputs))
+    if shuffle:
+      ds = ds.shuffle(len(inputs))
+    ds = ds.batch(self.batch_size)
+    ds = ds.map(split_batch, num_parallel_calls=tf.data.AUTOTUNE)
+
+    if cache is not None:
+      ds = ds.cache(cache)
+      if shuffle:
+        ds = ds.shuffle(-(-len(inputs) // self.batch_size))
+
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+  def make_stream_dataset(self, chunks, shuffle=True, shuffle_buffer=1000000):
+    """
+    `tf.data` pipeline of `inputs, labels` batches from data that does not
+    fit in memory. `chunks` is a callable that returns an iterable of
+    dataframes (or arrays), and it is called again on every epoch. Each chunk
+    is windowed on its own, so consecutive chunks must overlap by
+    `total_window_size - 1` rows for no window to be lost.
+    With `shuffle`, windows are drawn at random from a buffer that keeps at
+    least `shuffle_buffer` windows, so windows of consecutive chunks are
+    mixed. The chunks with windows left in the buffer stay in memory.
+    """
+    label_columns = self.label_selection()
+    features = len(self.column_indices)
+    label_count = features if self.label_columns is None else len(self.label_columns)
+
+    def gather(windows, references):
+      # Batch of the windows referenced as (chunk, window) pairs
+      batch_inputs = np.empty((len(references), self.input_width, features), dtype=np.float32)
+      batch_labels = np.empty((len(references), self.label_width, label_count), dtype=np.float32)
+      for chunk in np.unique(references[:, 0]):
+        rows = references[:, 0] == chunk
+        inputs, labels = windows[chunk]
+        batch_inputs[rows] = inputs[references[rows, 1]]
+        batch_labels[rows] = labels[references[rows, 1]][:, :, label_columns]
+      return batch_inputs, batch_labels
+
+    def batches():
+      windows = {}
+      buffer = np.empty((0, 2), dtype=np.int64)
+
+      for number, chunk in enumerate(chunks()):
+        # Chunks shorter than a window have no windows
+        if len(chunk) < self.total_window_size:
+          continue
+
+        windows[number] = self.make_windows(chunk)
+        if not shuffle:
+          inputs, labels = windows.pop(number)
+          for start in range(0, len(inputs), self.batch_size):
+            yield inputs[start:start + self.batch_size], \
+                  np.ascontiguousarray(labels[start:start + self.batch_size][:, :, label_columns])
+          continue
+
+        # Add the new windows to the buffer and draw batches until it is down to `shuffle_buffer`
+        count = len(windows[number][0])
+        buffer = np.concatenate([buffer, np.stack([np.full(count, number), np.arange(count)], axis=1)])
+        buffer = buffer[np.random.permutation(len(buffer))]
+        drawn = max(0, len(buffer) - shuffle_buffer) // self.batch_size * self.batch_size
+        for start in range(0, drawn, self.batch_size):
+          yield gather(windows, buffer[start:start + self.batch_size])
+        buffer = buffer[drawn:]
+
+        # Drop the chunks with no windows left in the buffer
+        for done in set(windows) - set(np.unique(buffer[:, 0]).tolist()):
+          del windows[done]
+
+      # The windows left in the buffer are already shuffled
+      for start in range(0, len(buffer), self.batch_size):
+        yield gather(windows, buffer[start:start + self.batch_size])
+
+    ds = tf.data.Dataset.from_generator(batches, output_signature=(
+        tf.TensorSpec([None, self.input_width, features], tf.float32),
+        tf.TensorSpec([None, self.label_width, label_count], tf.float32)))
+
+    # The next batches (and chunks) are read while the model trains
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+  def dataset(self, name, df, shuffle):
+    """Get and cache the dataset `name` made from `df`."""
+    if name not in self._datasets:
+      cache = self.cache
+      if cache:
+        # Each dataset needs its own cache files
+        cache = f'{cache}_{name}'
+      self._datasets[name] = self.make_dataset(df, shuffle=shuffle, cache=cache)
+    return self._datasets[name]
 
   def __call__(self):
     return self.train()
 
   @property
   def train(self):
-    return self.make_dataset(self.train_df)
+    return self.dataset('train', self.train_df, shuffle=True)
 
   @property
   def val(self):
-    return self.make_dataset(self.val_df)
+    # Kept in order, so predictions can be compared against the labels
+    return self.dataset('val', self.val_df, shuffle=False)
 
   @property
   def test(self):
-    return self.make_dataset(self.test_df)
+    return self.dataset('test', self.test_df, shuffle=False)
 
   @property
   def example(self):
@@ -1,11 +1,15 @@
-# Modelos pre-hechos
-from SIAX.NeuralNetworks.ModelConfiguration import ModelConfiguration
-from SIAX.NeuralNetworks.ModelBase import ModelBase
+from SIAX.LazyModule import LazyModule
 
-# Window Generators
-from SIAX.NeuralNetworks.NormalizedWindowGenerator import NormalizedWindowGenerator
-from SIAX.NeuralNetworks.WindowGenerator import WindowGenerator
-from SIAX.NeuralNetworks.WindowGeneratorFactory import WindowGeneratorFactory
+LazyModule.install(__name__, {
+  # Modelos pre-hechos
+  'ModelConfiguration': 'SIAX.NeuralNetworks.ModelConfiguration',
+  'ModelBase': 'SIAX.NeuralNetworks.ModelBase',
 
-# Strategias
-from SIAX.NeuralNetworks.NeuralNetworkStrategy import NeuralNetworkStrategy
\ No newline at end of file
+  # Window Generators
+  'NormalizedWindowGenerator': 'SIAX.NeuralNetworks.NormalizedWindowGenerator',
+  'WindowGenerator': 'SIAX.NeuralNetworks.WindowGenerator',
+  'WindowGeneratorFactory': 'SIAX.NeuralNetworks.WindowGeneratorFactory',
+
+  # Strategias
+  'NeuralNetworkStrategy': 'SIAX.NeuralNetworks.NeuralNetworkStrategy',
+})
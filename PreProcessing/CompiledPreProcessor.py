@@ -0,0 +1,87 @@
+import numpy as np
+
+class CompiledPreProcessor:
+  """
+  A PreProcessor step chain compiled to NumPy (see `PreProcessor.compile`).
+  It reads only the `inputs` columns as one float array and runs the
+  `functions` over it, with no DataFrames and no index handling in between.
+
+  Besides processing whole blocks with `__call__`, it can keep the last
+  processed window and update it one row at a time: `reset` processes a
+  full block of rows, and then each `update` only processes the newest row,
+  using the last `extra_rows` rows before it.
+  """
+
+  def __init__(self, inputs, functions, columns, extra_rows):
+    self.inputs = inputs
+    self.columns = columns
+    self.extra_rows = extra_rows
+    self._functions = functions
+
+    # Last raw rows (the ones the next row needs) and processed window
+    self._tail = None
+    self._window = None
+    self._position = 0
+
+  def __call__(self, data):
+    """
+    Processes `data`: a DataFrame with the `inputs` columns, or an array
+    with just those columns, in that order. Returns a 2D float array.
+    """
+    values = self._values(data)
+    for function in self._functions:
+      values = function(values)
+
+    return values
+
+  def _values(self, data):
+    if hasattr(data, 'columns'):
+      return data[self.inputs].to_numpy(dtype=np.float64)
+
+    return np.atleast_2d(np.asarray(data, dtype=np.float64))
+
+  def _last_values(self, data):
+    # Reading each column's last value skips building a one-row DataFrame
+    if hasattr(data, 'columns'):
+      return np.array([[data[column].iat[-1] for column in self.inputs]], dtype=np.float64)
+
+    if hasattr(data, 'index'):
+      return np.array([[data[column] for column in self.inputs]], dtype=np.float64)
+
+    return self._values(data)[-1:]
+
+  def reset(self, data):
+    """
+    Processes a whole block of rows and keeps its result as the current
+    window, so it can be moved forward with `update`. Returns the window.
+    """
+    values = self._values(data)
+    processed = self(values)
+
+    # The window is stored twice in a row, so it is always a contiguous slice
+    self._window = np.concatenate([processed, processed])
+    self._position = 0
+    self._tail = values[len(values) - self.extra_rows:].copy() if self.extra_rows else values[:0].copy()
+
+    return self._window[:len(processed)]
+
+  def update(self, new_row):
+    """
+    Adds the newest row (a Series, an array, or a DataFrame whose last row
+    is the new one) and returns the processed window moved forward by one
+    row. Only the new row is processed. The returned array is overwritten
+    by the next `update`.
+    """
+    assert self._window is not None, "reset must be called before update"
+
+    rows = np.concatenate([self._tail, self._last_values(new_row)])
+    processed = self(rows)[-1]
+    if self.extra_rows:
+      self._tail = rows[1:]
+
+    size = len(self._window) // 2
+    self._window[self._position] = processed
+    self._window[self._position + size] = processed
+    self._position = (self._position + 1) % size
+
+    return self._window[self._position:self._position + size]
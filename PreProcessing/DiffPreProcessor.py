@@ -14,4 +14,14 @@ class DiffPreProcessor(KeepColumnsPreProcessor):
     self.extra_rows += 1
 
   def _diff(self, df):
-    return df.diff()[1:]
\ No newline at end of file
+    return df.diff()[1:]
+
+  def _compile_step(self, step, columns):
+    if step == self._diff:
+      return self._diff_values, columns
+
+    return super()._compile_step(step, columns)
+
+  @staticmethod
+  def _diff_values(values):
+    return values[1:] - values[:-1]
\ No newline at end of file
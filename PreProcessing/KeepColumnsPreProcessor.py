@@ -15,4 +15,14 @@ class KeepColumnsPreProcessor(PreProcessor):
     return df.reset_index()
 
   def _keep_only_required_columns(self, df):
-    return df[self._columns_to_keep]
\ No newline at end of file
+    return df[self._columns_to_keep]
+
+  def _compile_step(self, step, columns):
+    # The index only becomes a column that is dropped right after
+    if step == self._reset_index and all(column in columns for column in self._columns_to_keep):
+      return list(range(len(columns))), columns
+
+    if step == self._keep_only_required_columns and all(column in columns for column in self._columns_to_keep):
+      return [columns.index(column) for column in self._columns_to_keep], list(self._columns_to_keep)
+
+    return super()._compile_step(step, columns)
\ No newline at end of file
@@ -1,3 +1,5 @@
+from SIAX.PreProcessing.CompiledPreProcessor import CompiledPreProcessor
+
 class PreProcessor:
   """
   This class has a __call__ method that applies transformations to a dataframe
@@ -14,4 +16,43 @@ class PreProcessor:
     return df
 
   def _append_step(self, step):
-    self._steps.append(step)
\ No newline at end of file
+    self._steps.append(step)
+
+  def compile(self, columns):
+    """
+    Compiles the steps into a CompiledPreProcessor for data with these
+    `columns`: a single NumPy function over the raw float array, with the
+    column selections fused into one read of the input columns.
+    Returns None if any step has no NumPy version (see `_compile_step`).
+    """
+    columns = list(columns)
+    selection = list(range(len(columns)))
+    functions = []
+    output = columns
+
+    for step in self._steps:
+      compiled = self._compile_step(step, output)
+      if compiled is None:
+        return None
+
+      operation, output = compiled
+      if callable(operation):
+        functions.append(operation)
+      elif functions:
+        functions.append(lambda values, indices=operation: values[:, indices])
+      else:
+        selection = [selection[i] for i in operation]
+
+    inputs = [columns[i] for i in selection]
+
+    return CompiledPreProcessor(inputs, functions, output, self.extra_rows)
+
+  def _compile_step(self, step, columns):
+    """
+    NumPy version of one of the `_steps`, for data with these `columns`, as
+    an (operation, output columns) tuple. The operation is either a list of
+    the column indices it keeps, or a function from 2D array to 2D array.
+    Returns None when the step has no NumPy version. Subclasses that add
+    steps extend this method.
+    """
+    return None
\ No newline at end of file
@@ -1,7 +1,11 @@
-from SIAX.PreProcessing.DataFramePlotting import DataFramePlotting
-from SIAX.PreProcessing.DataFrameProcessing import DataFrameProcessing
+from SIAX.LazyModule import LazyModule
 
-from SIAX.PreProcessing.PreProcessor import PreProcessor
-from SIAX.PreProcessing.KeepColumnsPreProcessor import KeepColumnsPreProcessor
-from SIAX.PreProcessing.DiffPreProcessor import DiffPreProcessor
+LazyModule.install(__name__, {
+  'DataFramePlotting': 'SIAX.PreProcessing.DataFramePlotting',
+  'DataFrameProcessing': 'SIAX.PreProcessing.DataFrameProcessing',
 
+  'PreProcessor': 'SIAX.PreProcessing.PreProcessor',
+  'CompiledPreProcessor': 'SIAX.PreProcessing.CompiledPreProcessor',
+  'KeepColumnsPreProcessor': 'SIAX.PreProcessing.KeepColumnsPreProcessor',
+  'DiffPreProcessor': 'SIAX.PreProcessing.DiffPreProcessor',
+})
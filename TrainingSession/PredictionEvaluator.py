@@ -6,26 +6,82 @@ class PredictionEvaluator:
   """
   A partir de la serie de validación y de la predicción que devolvió el modelo
   genera una PredictionEvaluation con los resultados de evaluarlos.
+
+  Las series se pueden pasar enteras al crearlo, o de a partes con update:
+  en ambos casos los errores se van acumulando por bloques, así la memoria
+  temporal no depende del largo de la serie. Para el gráfico sólo se guarda
+  una muestra de a lo sumo _PLOT_POINTS puntos de cada serie.
   """
 
-  def __init__(self, validation, prediction):
+  # Cantidad de filas que se evalúan por vez
+  _CHUNK_SIZE = 1 << 20
+
+  # Máxima cantidad de puntos de cada serie que se guardan para el gráfico
+  _PLOT_POINTS = 100000
+
+  def __init__(self, validation = None, prediction = None):
+
+    # Cantidad de elementos de la predicción evaluados hasta ahora
+    self._prediction_size = 0
+
+    # Sumas de los errores y cantidad de aciertos en la dirección
+    self._absolute_error = 0.0
+    self._squared_error = 0.0
+    self._correct_direction = 0
+
+    # Muestra de ambas series para el gráfico: una fila cada _plot_step
+    self._plot_step = 1
+    self._plot_validation = []
+    self._plot_prediction = []
 
-    # Guardo la cantidad de elementos que tiene de la predicción
-    self._prediction_size = prediction.shape[0]
+    if prediction is not None:
 
-    # Guardo la predicción
-    self._prediction = prediction
+      # De la serie de validación descarto los elementos para los cuales
+      # no generé ninguna predicción
+      validation = validation[-prediction.shape[0]:]
+
+      for start in range(0, prediction.shape[0], self._CHUNK_SIZE):
+        end = start + self._CHUNK_SIZE
+        self.update(validation[start:end], prediction[start:end])
+
+
+  def update(self, validation, prediction):
+    """
+    Agrega una parte de la serie de validación y su predicción, que deben
+    tener el mismo largo y venir en orden.
+    """
 
-    # De la serie de validación descarto los elementos para los cuales
-    # no generé ninguna predicción
-    self._validation = validation[-self._prediction_size:]
+    # Calculo el error una sola vez para todas las métricas
+    error = np.asarray(prediction, dtype = np.float64) - validation
+
+    self._absolute_error += np.abs(error).sum()
+    self._squared_error += np.square(error, out = error).sum()
+    self._correct_direction += np.count_nonzero((prediction * validation) > 0)
+
+    self._sample(validation, prediction)
+    self._prediction_size += prediction.shape[0]
+
+
+  def _sample(self, validation, prediction):
+    """
+    Guarda las filas múltiplos de _plot_step. Si la muestra se pasa de
+    _PLOT_POINTS, duplica el paso y se queda con la mitad de las filas.
+    """
+    first = -self._prediction_size % self._plot_step
+    self._plot_validation.append(np.array(validation[first::self._plot_step]))
+    self._plot_prediction.append(np.array(prediction[first::self._plot_step]))
+
+    if sum(len(part) for part in self._plot_prediction) > self._PLOT_POINTS:
+      self._plot_validation = [np.concatenate(self._plot_validation)[::2]]
+      self._plot_prediction = [np.concatenate(self._plot_prediction)[::2]]
+      self._plot_step *= 2
 
 
   def evaluate(self):
     """
     Hace la evaluación a partir de las series con las que se creó.
     Esto es un método separado porque en un futuro puede tardar más tiempo.
-    
+
     Devuelve:
     Una PredictionEvaluation con la información de la evaluación
     """
@@ -50,16 +106,19 @@ class PredictionEvaluator:
     Devuelve un gráfico comparando la predicción y la serie de validación
     """
 
-    time = range(self._prediction_size)
+    validation = np.concatenate(self._plot_validation) if self._plot_validation else []
+    prediction = np.concatenate(self._plot_prediction) if self._plot_prediction else []
+
+    time = range(0, len(prediction) * self._plot_step, self._plot_step)
 
     # Inicializo del gráfico
     plt.figure(figsize=(30, 6))
     plt.xlabel("Time")
     plt.ylabel("Value")
     plt.grid(True)
-    
-    plt.plot(time, self._validation)
-    plt.plot(time, self._prediction)
+
+    plt.plot(time, validation)
+    plt.plot(time, prediction)
 
     return plt
 
@@ -68,14 +127,14 @@ class PredictionEvaluator:
     """
     Calcula el Mean Absolute Error
     """
-    return np.sum(np.abs(self._validation - self._prediction)) / self._prediction_size
+    return self._absolute_error / self._prediction_size
 
 
   def _calculate_mse(self):
     """
     Calcula el Mean Squared Error
     """
-    return np.sum((self._validation - self._prediction) ** 2) / self._prediction_size
+    return self._squared_error / self._prediction_size
 
   def _calculate_correct_direction(self):
     """
@@ -85,4 +144,4 @@ class PredictionEvaluator:
 
     Si predijo 0 o el real fue 0, no lo toma como válido.
     """
-    return np.sum((self._prediction  * self._validation) > 0) * 100 / self._prediction_size
\ No newline at end of file
+    return self._correct_direction * 100 / self._prediction_size
@@ -9,6 +9,7 @@ from SIAX.NeuralNetworks.WindowGenerator import WindowGenerator
 from SIAX.TrainingSession.PredictionEvaluator import PredictionEvaluator
 from SIAX.PreProcessing.DataFrameProcessing import DataFrameProcessing
 from SIAX.PreProcessing.PreProcessor import PreProcessor
+from SIAX.Misc.MarketDataStream import MarketDataStream
 
 class TrainingSession:
   """
@@ -17,15 +18,19 @@ class TrainingSession:
 
   La clase requiere:
 
-  * model: Un modelo que tenga los siguientes 3 métodos:
+  * model: Un modelo que tenga los siguientes 4 métodos:
 
   *** train: que reciba una serie de tiempo
   *** call: que reciba un dataframe y que prediga el siguiente valor de una de sus features
+  *** predict_on_batch: que reciba un batch de ventanas y devuelva un array con su predicción
   *** save_model: que reciba un directorio y guarde su representación en archivos ahí adentro
 
   *** Además tiene que tener una propiedad `window_size` que represente el tamaño de la ventana que usa
   
-  * training_market_data: Un objeto de la clase MarketData con el cual va a entrenar
+  * training_market_data: Un objeto de la clase MarketData con el cual va a entrenar.
+    También puede ser un MarketDataStream (ver MarketDataRepository.get_dataset_stream): en ese caso
+    los datos se leen, pre procesan y agrupan en ventanas de a bloques en cada epoch, sin cargarlos
+    enteros en memoria.
 
   * validation_market_data: Un objeto de la clase MarketData con el cual va a hacer la validación
 
@@ -38,9 +43,13 @@ class TrainingSession:
   * save_full_predictions: (opcional) si se setea en True, el array completo de predicción y validación
   se van a guardar en un csv. Esto ocupa mucho espacio y generalmente no aporta mucha información, por
   lo que su valor por defecto es False.
+
+  * cache_windows: (opcional) dónde guardar las ventanas ya armadas, para no volver a armarlas en cada
+  epoch: '' para guardarlas en memoria, o el prefijo de un archivo para guardarlas en disco.
+  Por defecto es None, y no se guardan.
   """
 
-  def __init__(self, model, training_market_data, validation_market_data, pre_processor = PreProcessor(), results_storage = 'results', save_full_predictions = False):
+  def __init__(self, model, training_market_data, validation_market_data, pre_processor = PreProcessor(), results_storage = 'results', save_full_predictions = False, cache_windows = None):
 
     # Un identificador único que se va reseteando si cambia algo en la sesión
     self.__reset_identifier__()
@@ -60,8 +69,11 @@ class TrainingSession:
     # El procesador de dataframes a usar
     self._window_size = model.window_size
 
-    # La serie que va a predecir
+    # La serie que va a predecir, la de validación (sólo si se guardan, ver abajo)
+    # y la cantidad de ventanas de validación
     self._forecast = None
+    self._valid = None
+    self._validation_size = 0
 
     # Guardar toda la predicción ocupa demasiado espacio, pero si por algún motivo
     # queremos guardarlas, seteando este parámetro en True, se guradan en un csv
@@ -70,6 +82,9 @@ class TrainingSession:
     # Un preprocesador que recibe un dataframe, lo procesa y lo devuelve
     self.pre_processor = pre_processor
 
+    # Dónde guardar las ventanas de training y validación (ver WindowGenerator)
+    self._cache_windows = cache_windows
+
     # Para Backtesting
     self._backtesting_market_data = None
     self._backtesting_strategy = None
@@ -89,42 +104,65 @@ class TrainingSession:
     # Creo un identificador nuevo porque vuelvo a correr
     self.__reset_identifier__()
 
+    ## Validation Data
+
+    # Pre procesamiento de los datos
+    validation_data = self.pre_processor(self._validation_market_data.dataset)
+
+
     ## Training Data
 
-    # Pre procesamiento de los datos    
-    training_data = self.pre_processor(self._training_market_data.dataset)
+    # Agrupo los datos en ventanas. Cada dataset se arma una sola vez y se reutiliza en cada epoch.
+    # Las de training vienen mezcladas porque durante el training es preferible que la data no esté ordenada,
+    # y las de validación en orden, porque quiero comparar y graficar
+    if isinstance(self._training_market_data, MarketDataStream):
 
-    # Agrupo los datos en ventanas. Shuffle = True porque durante el training es preferible que la data no esté ordenada
-    trining_windows = WindowGenerator(training_data, self._window_size).make_dataset(training_data, shuffle=True)
+      # Los datos de training se leen por bloques en cada epoch.
+      # Las columnas salen de los datos de validación, que pasan por el mismo pre procesamiento
+      windows = WindowGenerator(validation_data, self._window_size, val_df = validation_data, cache = self._cache_windows)
+      trining_windows = windows.make_stream_dataset(lambda: self._training_chunks(windows.total_window_size))
 
+    else:
 
-    ## Validation Data
+      # Pre procesamiento de los datos
+      training_data = self.pre_processor(self._training_market_data.dataset)
 
-    # Pre procesamiento de los datos
-    validation_data = self.pre_processor(self._validation_market_data.dataset)
+      windows = WindowGenerator(training_data, self._window_size, val_df = validation_data, cache = self._cache_windows)
+      trining_windows = windows.train
 
-    # Agrupo los datos en ventanas. Shuffle = False porque quiero la información en orden para comparar y graficar
-    val_windows = WindowGenerator(validation_data, self._window_size).make_dataset(validation_data, shuffle=False)
+    val_windows = windows.val
 
     # Entreno el modelo con el set correspondiente y pasándole la data de validación para imprimir métricas
     self._model.train(trining_windows, validation_data = val_windows)
 
-    # Predigo usando las ventanas de validación
-    self._forecast = np.array([yhat for x, y in val_windows for yhat in self._model.call(x)])
+    # Predigo las ventanas de validación de a un batch y evalúo cada uno contra sus labels,
+    # así la memoria no depende de la cantidad de ventanas
+    evaluator = PredictionEvaluator()
+    windows_count = max(len(validation_data) - windows.total_window_size + 1, 0)
+    self._forecast = self._valid = None
+    self._validation_size = 0
 
-    # Quito las dimensiones extra
-    self._forecast = np.squeeze(self._forecast)
+    for inputs, labels in val_windows:
+      forecast = self._flatten(self._model.predict_on_batch(inputs))
+      labels = self._flatten(labels)
 
-    # Formateo los true labels de las ventanas de validación
-    self._valid = np.array([y for _, y_batch in val_windows for y in y_batch])
+      assert len(forecast) == len(labels), f'Error. Forecast length: {len(forecast)}, Validation length: {len(labels)}'
 
-    # Quito las dimensiones extra
-    self._valid = np.squeeze(self._valid)
+      evaluator.update(labels, forecast)
 
-    assert len(self._forecast) == len(self._valid), f'Error. Forecast length: {len(self._forecast)}, Validation length: {len(self._valid)}'
+      # Si se van a guardar, las copio en arrays armados una sola vez
+      if self._save_predictions:
+        if self._valid is None:
+          self._valid = np.empty((windows_count,) + labels.shape[1:], dtype = labels.dtype)
+          self._forecast = np.empty((windows_count,) + forecast.shape[1:], dtype = forecast.dtype)
 
-    # Creo un evaluador para la serie de validación y la predicción
-    evaluator = PredictionEvaluator(self._valid, self._forecast)
+        end = self._validation_size + len(labels)
+        self._valid[self._validation_size : end] = labels
+        self._forecast[self._validation_size : end] = forecast
+
+      self._validation_size += len(labels)
+
+    assert self._validation_size == windows_count, f'Error. Predicted windows: {self._validation_size}, Validation windows: {windows_count}'
 
     # Guardo la evaluación de la predicción.
     self._evaluation = evaluator.evaluate()
@@ -133,6 +171,21 @@ class TrainingSession:
     self.__persist__()
 
 
+  def _training_chunks(self, total_window_size):
+    """
+    Generador de los bloques de datos de training ya pre procesados.
+    Cada bloque se lee con las filas del anterior que hacen falta para no perder
+    nada en el borde: las extra_rows que consume el pre procesador, más las de una
+    ventana menos una, para armar las ventanas que terminan en las filas nuevas.
+    Los bloques de los distintos símbolos vienen alternados, para que se mezclen
+    al armar los batches.
+    """
+    overlap = self.pre_processor.extra_rows + total_window_size - 1
+
+    for chunk in self._training_market_data.chunks(overlap, interleave = True):
+      yield self.pre_processor(chunk)
+
+
   def set_backtesting_info(self, backtesting_market_data, backtesting_strategy, verbose = 1):
     """
     Setea los datos con los cuales va a hacer el backtesting.
@@ -237,13 +290,24 @@ class TrainingSession:
     mae = self._evaluation.mae
     mse = self._evaluation.mse
     correct_direction = self._evaluation.correct_direction
-    validation_size = self._valid.shape[0]
+    validation_size = self._validation_size
     identifier = self._identifier
     training_data = self._training_market_data.summary()
 
     return f"Identifier,DateTime,TrainingData,MAE,MSE,Validation Size,Correct Direction\n" + \
       f"{identifier},{dt},{training_data},{mae},{mse},{validation_size},{correct_direction}"
 
+  @staticmethod
+  def _flatten(values):
+    """
+    Una fila por ventana: quita las dimensiones extra de un batch de labels
+    o predicciones, sin perder la del batch aunque tenga una sola ventana.
+    """
+    values = np.asarray(values)
+    values = values.reshape(len(values), -1)
+
+    return values[:, 0] if values.shape[1] == 1 else values
+
   def __persisst_arrays__(self, directory):
     """
     Si self._save_predictions es True, guardo los arrays de validación y predicción completos
@@ -1,3 +1,7 @@
-from SIAX.TrainingSession.PredictionEvaluation import PredictionEvaluation
-from SIAX.TrainingSession.PredictionEvaluator import PredictionEvaluator
-from SIAX.TrainingSession.TrainingSession import TrainingSession
\ No newline at end of file
+from SIAX.LazyModule import LazyModule
+
+LazyModule.install(__name__, {
+  'PredictionEvaluation': 'SIAX.TrainingSession.PredictionEvaluation',
+  'PredictionEvaluator': 'SIAX.TrainingSession.PredictionEvaluator',
+  'TrainingSession': 'SIAX.TrainingSession.TrainingSession',
+})
@@ -0,0 +1,119 @@
+import asyncio, pandas
+from AZMQL import AZMQL
+from MTrack import MTrack
+from RingBuffer import RingBuffer
+
+class AMTrack(AZMQL, MTrack):
+
+#### Constantes de clase ###############################################################################################
+
+    _QueueSize = 10000 #| Máxima cantidad de ticks sin leer, por iterador. Luego, se descartan los más antiguos.
+
+#### Constructor #######################################################################################################
+
+    def __init__(self, context, verbose = 1, max_rows = None, rcvhwm = 10000, sndhwm = 1000, ports = None,
+                 metrics = 0):
+        """
+        Object initializer
+        Asynchronous (asyncio) version of MTrack. Data "Base" and message parsing are the same, but "download" and
+        "subscribe" are awaitables that resolve when MQL answers the request, and incoming market data can be read as
+        an async iterator per symbol with "ticks". Must be started with "await INST.start()" (see AZMQL).
+        Inputs:
+            >> "context"... "zmq.asyncio.Context" object. Will identify all ports in the protocol.
+            >> "verbose", "max_rows", "rcvhwm", "sndhwm", "ports" & "metrics"... Same as in MTrack. With no pauses
+                            between sends (see AZMQL), "sndhwm" should allow a few queued requests.
+        """
+        self.Streams = dict() #| Colas de cada iterador de "ticks", por "symbol".
+        MTrack.__init__(self, context, verbose = verbose, max_rows = max_rows, drain = True, rcvhwm = rcvhwm,
+                        sndhwm = sndhwm, ports = ports, metrics = metrics)
+
+#### Solicitud de datos históricos #####################################################################################
+
+    async def download(self, symbol, frame, rows = 10000, binary = False, timeout = None):
+        """
+        Function for OHLCVS data download.
+        Same as in MTrack, but resolves once MQL4's answer was processed. Returns the symbol's "RingBuffer" in "Base",
+        or "None" if the request could not be made, MQL4 reported an error, or nothing arrived before "timeout".
+        """
+        key = symbol.upper() if isinstance(symbol, str) else symbol
+        future = self._expect("OHLCV", key) #| Registrar la espera antes de enviar la solicitud.
+        if not MTrack.download(self, symbol, frame, rows, binary): future.cancel() ; return None
+        content = await self._wait(future, timeout)
+        if (content == None) or isinstance(content, tuple): return None
+        return self.Base[key]
+
+#### Solicitud de (de)suscripción a datos ##############################################################################
+
+    async def subscribe(self, symbol, frame, slot = 0, timeout = None):
+        """
+        Function for tick data subscription.
+        Same as in MTrack, but resolves once MQL4 confirms the subscription. Returns "True" if it did.
+        """
+        key = symbol.upper() if isinstance(symbol, str) else symbol
+        future = self._expect("Ticks", key) #| Registrar la espera antes de enviar la solicitud.
+        if not MTrack.subscribe(self, symbol, frame, slot): future.cancel() ; return False
+        content = await self._wait(future, timeout)
+        return isinstance(content, list)
+
+#### Iteradores de datos de mercado ####################################################################################
+
+    async def ticks(self, symbol):
+        """
+        Async iterator over the new market data rows of "symbol", as "(Timestamp, OHLCVS array)" tuples.
+        E.g.: "async for T, candle in INST.ticks('EURUSD'): ...". Every iterator gets every row stored in "Base" after
+        it was created, in order. If the reader falls behind by more than "_QueueSize" rows, the oldest ones are lost.
+        It ends when the object is shut down.
+        Inputs:
+            >> "symbol"...  Symbol (string) associated with a tradable instrument in MetaTrader.
+        """
+        queue = asyncio.Queue(AMTrack._QueueSize)
+        self.Streams.setdefault(symbol.upper(), list()).append(queue)
+        try:
+            while True:
+                tick = await queue.get()
+                if (tick == None): return #| Objeto cerrado.
+                yield tick
+        finally: self.Streams[symbol.upper()].remove(queue)
+
+    def _last_times(self):
+        """
+        Newest timestamp stored for each symbol with open iterators, before processing new messages.
+        """
+        return {symbol: self.Base[symbol].last_time() for symbol, queues in self.Streams.items()
+                if queues and isinstance(self.Base.get(symbol), RingBuffer)}
+
+    def _publish(self, last_times):
+        """
+        Hands the rows stored after "last_times" to the iterators of each symbol.
+        """
+        for symbol, T in last_times.items():
+            times, values = self.Base[symbol].since(T)
+            for n in range(len(times)):
+                tick = (pandas.Timestamp(times[n]), values[n].copy())
+                for queue in self.Streams[symbol]:
+                    if queue.full(): queue.get_nowait() #| Descartar el más antiguo.
+                    queue.put_nowait(tick)
+
+#### Procesamiento en recepción ########################################################################################
+
+    def _process(self, message):
+
+        last_times = self._last_times()
+        super()._process(message)
+        self._publish(last_times)
+
+    def _process_records(self, records):
+
+        last_times = self._last_times()
+        super()._process_records(records)
+        self._publish(last_times)
+
+#### Terminación #######################################################################################################
+
+    async def _shutdown(self, EA = False):
+
+        await super()._shutdown(EA)
+        for queues in self.Streams.values(): #| Terminar los iteradores.
+            for queue in queues:
+                if queue.full(): queue.get_nowait()
+                queue.put_nowait(None)
@@ -0,0 +1,178 @@
+import asyncio, sys
+import zmq, zmq.asyncio
+from ZMQL import ZMQL
+
+class AZMQL(ZMQL):
+
+#### Constantes de clase ###############################################################################################
+
+    _SendPause = 0 #| Sin pausas luego de enviar: las respuestas se esperan con "await".
+    _Timeout = 10 #| Segundos de espera máxima por defecto, para cada respuesta de MQL.
+
+#### Constructor #######################################################################################################
+
+    def __init__(self, context, ID, ports = ZMQL._PortsDef, verbose = 1, rcvhwm = 1000, sndhwm = 1000, metrics = 0):
+        """ Object initializer.
+        Asynchronous (asyncio) version of ZMQL. Instead of a parallel Thread that polls every socket, reception runs as
+        a task inside the event loop, and every request that expects an answer from MQL is an awaitable that resolves
+        as soon as the matching response arrives (no more "time.sleep" while hoping for it). Many instances, each one
+        with its own ports (one per MetaTrader terminal), can run inside the same process and event loop.
+        The object must be started from a coroutine with "await INST.start()", and closed with "await INST._shutdown()".
+        Messages are always read in "drain" mode (see ZMQL's "_receive").
+        Inputs:
+            >> "context"... "zmq.asyncio.Context" object. Will identify all ports in the protocol.
+            >> "ID", "ports", "verbose", "rcvhwm", "sndhwm" & "metrics"... Same as in ZMQL.
+        """
+        super().__init__(context, ID, ports = ports, verbose = verbose, drain = True, rcvhwm = rcvhwm, sndhwm = sndhwm,
+                         metrics = metrics)
+
+    def _start(self, ID):
+        """ Receiver start.
+        Nothing is launched here, as "__init__" is not a coroutine: just the asyncio version of the "Poller" is set.
+        Called at the end of ZMQL's "__init__", so it is also run by subclasses that reach it through another parent.
+        """
+        assert all([isinstance(self.Comm["Socket"][label], zmq.asyncio.Socket) for label in self.Comm.index]), \
+               "((INIT)) ERROR! Use a valid \"zmq.asyncio.Context\" input."
+        self.Waiting = dict() #| Respuestas esperadas: {(asunto, clave): [Futures, en orden de pedido]}.
+        self.Task = None #| Tarea de recepción, en el "event loop".
+        self.Poller = zmq.asyncio.Poller() #| "poll" awaitable, en lugar del bloqueante.
+        for label in self.Counters: self.Poller.register(self.Comm["Socket"][label], zmq.POLLIN)
+
+    async def start(self, timeout = 1):
+        """ Receiver start.
+        Launches "_receive" as a task in the running event loop, and checks the connection with MetaTrader.
+        Returns "True" if the check was successful. Otherwise, shuts down and returns "False".
+        """
+        self.Task = asyncio.ensure_future(self._receive())
+        if await self._check(timeout):
+            print("[[CHECK]] Successfully initialized and connected to MetaTrader! :)") ; return True
+        print("((CHECK)) ERROR! Connection unsuccessful. Shutting down... :(")
+        await self._shutdown() ; return False
+
+#### Terminación #######################################################################################################
+
+    async def _shutdown(self, EA = False):
+        """ ZMQ shutdown.
+        Same as in ZMQL, but awaiting the reception task instead of joining a Thread. Every pending request is
+        cancelled.
+        Inputs:
+            >> "EA".... If "True", force EA to close as well.
+        """
+        print("---------------------------------------"*2)
+        for label in self.Comm.index:
+            if EA and ("S" in self.Comm.loc[label, "Role"]): self._send(label, "Shutdown")
+        await asyncio.sleep(0.5) #| Esperar a que responda confirmando su propia terminación.
+        self.Enable["comm"] = False #| Desactivar comunicación. La tarea de recepción termina en el próximo "poll".
+        if self.Task: await self.Task
+        for futures in self.Waiting.values(): #| Nadie va a responder ya a las solicitudes pendientes.
+            for future in futures: future.cancel()
+        self._disconnect()
+
+#### Espera de respuestas ##############################################################################################
+
+    def _expect(self, subject, key = None):
+        """ Response registration.
+        Creates (and returns) a "Future" that will be resolved with the "content" of the next message with such
+        "subject" and "key" (the first element of the "content", or the "content" itself if it is a string).
+        Must be called BEFORE sending the request, so that the answer can not arrive before it.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.Waiting.setdefault((subject, key), list()).append(future)
+        return future
+
+    def _resolve(self, subject, content):
+        """ Response delivery.
+        Resolves the oldest pending "Future" registered with "_expect" for this "subject" and "content".
+        """
+        if isinstance(content, (list, tuple)) and content: key = content[0]
+        else: key = content if isinstance(content, (str, int, float)) else None
+        futures = self.Waiting.get((subject, key), list())
+        while futures: #| Saltear los que ya fueron cancelados (por "timeout").
+            future = futures.pop(0)
+            if not future.done(): future.set_result(content) ; return
+
+    @staticmethod
+    async def _wait(future, timeout = None):
+        """ Awaits a "Future" from "_expect". Returns "None" if nothing arrived before "timeout" seconds, or if the
+        request was cancelled by "_shutdown". Cancelling the awaiting task still raises "CancelledError".
+        """
+        try: await asyncio.wait({future}, timeout = AZMQL._Timeout if (timeout == None) else timeout)
+        finally: #| Sin respuesta a tiempo (o tarea cancelada): "_resolve" la saltea.
+            if not future.done(): future.cancel()
+        return None if future.cancelled() else future.result()
+
+#### Comprobación de comunicación ######################################################################################
+
+    async def _check(self, timeout = 1):
+        """ Comm socket validation.
+        Same as in ZMQL: sends a "Check" message throughout its TX sockets, and awaits for any message to arrive to
+        every RX socket. Returns "False" if any of them stays silent for more than "timeout" seconds.
+        """
+        arrivals = {label: self._expect("_Arrival", label) for label in self.Counters}
+        for label in self.Comm.index: #| Enviar checks por todos los sockets de transmisión.
+            if "S" in self.Comm.loc[label, "Role"]: self._send(label, "Check")
+        for label, future in arrivals.items(): #| Revisar todos los sockets de recepción.
+            if (await self._wait(future, timeout) != None): continue
+            #| No se recibió nada. Hubo alguna falla.
+            print(f">>{label}<< ERROR! MQL4 \"check\" not answering!")  ;  return False
+        return True
+
+#### Negociación de formato ############################################################################################
+
+    async def _negotiate(self, label, fmt = "binary", timeout = 1):
+        """ Message format negotiation.
+        Same as in ZMQL, but awaiting MQL's answer instead of polling "Comm" for it.
+        """
+        assert "R" in self.Comm.loc[label, "Role"], "((FORMAT)) ERROR! Formats are negotiated for receiving sockets."
+        future = self._expect("Format", label)
+        for sender in self.Comm.index: #| El pedido sale por el primer socket de envío.
+            if "S" in self.Comm.loc[sender, "Role"]: self._send(sender, f"Format;{label};{fmt}") ; break
+        await self._wait(future, timeout)
+        return (self.Comm.loc[label, "Format"] == fmt)
+
+    def _response_Format(self, content):
+
+        super()._response_Format(content)
+        self._resolve("Format", content)
+
+#### Recepción de mensajes #############################################################################################
+
+    async def _receive(self):
+        """ Message receiver.
+        Same as ZMQL's "_receive" in "drain" mode, but awaiting the "poll" instead of blocking a Thread with it.
+        Runs as a task, launched by "start".
+        """
+        receivers = {self.Comm["Socket"][label]: label for label in self.Counters}
+        while self.Enable["comm"]:
+            sockets_polled = dict(await self.Poller.poll(ZMQL._PollTimeout))
+            for Socket, label in receivers.items():
+                if (sockets_polled.get(Socket) != zmq.POLLIN): continue
+                messages = AZMQL._drain(Socket, ZMQL._MaxBatch)
+                if messages: self._dispatch(label, messages)
+                sys.stdout.flush()
+
+    @staticmethod
+    def _drain(Socket, limit):
+        """ Non-blocking socket reading.
+        Same as in ZMQL. With "DONTWAIT", asyncio sockets return "Futures" that are already resolved.
+        """
+        messages = list()
+        while (len(messages) < limit):
+            try: messages.append(Socket.recv(zmq.DONTWAIT).result())
+            except zmq.error.ZMQError: break #| "Again": socket vacío.
+        return messages
+
+    def _dispatch(self, label, messages):
+
+        super()._dispatch(label, messages)
+        self._resolve("_Arrival", label) #| Para "_check": llegó algo a este socket.
+
+#### Procesamiento en recepción ########################################################################################
+
+    def _process(self, message):
+        """ Received message processing.
+        After the usual processing (subclass' or ZMQL's), resolves any request awaiting for this message's subject.
+        """
+        try: super()._process(message)
+        finally: #| Aún si falla el procesamiento, quien espera la respuesta debe enterarse.
+            if isinstance(message, dict) and message: self._resolve(*next(iter(message.items())))
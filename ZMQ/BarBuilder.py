@@ -0,0 +1,140 @@
+import datetime, numpy, pandas
+from RingBuffer import RingBuffer
+
+class BarBuilder:
+
+#### Constantes de clase ###############################################################################################
+
+    _TFLabels = {"T": "ticks", "Z": "milliseconds", "S": "seconds", "M": "minutes", "H": "hours", "D": "days"}
+    _Rules = ("first", "max", "min", "last", "sum") #| Reglas de agregación admitidas, como en "MTrack._DColumns".
+
+#### Constructor #######################################################################################################
+
+    def __init__(self, frame, rules, capacity):
+        """
+        Object initializer
+        Online candle builder for a single symbol and timeframe. Instead of resampling the whole history (as
+        "MTrack._reframe" does), it keeps the state of the candle in progress and updates it with each new row (tick or
+        smaller candle) in O(1), following the aggregation "rules" of each column (e.g.: "MTrack._DColumns"). When a row
+        falls into a new interval, the candle in progress is completed: it is stored in "Store" (a "RingBuffer") and
+        handed to every callback in "Callbacks". A candle is thus completed as soon as the next one receives its
+        first row. Time intervals are aligned to midnight, as in "_reframe". In tick frames ("T"), candles are made of
+        "N" rows, and labeled with the time of their first row.
+        Inputs:
+            >> "frame"...   Timeframe label (string) following MetaTrader standards, plus "T" (ticks) & "Z" (ms).
+            >> "rules"...   "dict" with the aggregation rule of each column: "first", "max", "min", "last" or "sum".
+            >> "capacity"...Maximum amount of completed candles kept in "Store".
+        """
+        time_unit, N = BarBuilder._TFLabels[frame[0]], int(frame[1:]) #| Separar en letra y número.
+        assert all([rule in BarBuilder._Rules for rule in rules.values()]), \
+               f"ERROR! Aggregation rules must be one of {BarBuilder._Rules}."
+        self.Frame = frame
+        self.Ticks = N if (time_unit == "ticks") else None #| Filas por vela, en marcos irregulares.
+        delta = None if self.Ticks else datetime.timedelta(**{time_unit: N})
+        self.Delta = int(delta/datetime.timedelta(microseconds = 1))*1000 if delta else None #| En nanosegundos.
+        self.Columns = list(rules.keys())
+        self.Rules = list(rules.values())
+        self.Store = RingBuffer(self.Columns, capacity) #| Velas completas.
+        self.Callbacks = list() #| Funciones "callback(frame, T, values)" a llamar con cada vela completa.
+        self.Count = 0 #| Filas recibidas (para marcos de ticks).
+        self.Bin = None #| Intervalo de la vela en curso.
+        self.Time = None #| Marca de tiempo (nanosegundos) de la vela en curso.
+        self.Bar = None #| Valores de la vela en curso.
+
+#### Vela en curso #####################################################################################################
+
+    def current(self):
+        """
+        Candle in progress, as "(Timestamp, values)". "None" if no row was received yet.
+        """
+        if (self.Bar == None): return None
+        return pandas.Timestamp(self.Time), numpy.array(self.Bar)
+
+    def _bins(self, T, count):
+        """
+        Interval of each row: start time for regular frames, or candle number for tick frames.
+        """
+        if self.Ticks: return (self.Count + numpy.arange(count)) // self.Ticks
+        return T - T % self.Delta
+
+    def _combine(self, bar, new):
+        """
+        Joins the values of two consecutive pieces of the same candle, according to the "rules".
+        """
+        combined = list()
+        for rule, a, b in zip(self.Rules, bar, new):
+            if (rule == "first"): combined.append(a)
+            elif (rule == "last"): combined.append(b)
+            elif (rule == "max"): combined.append(a if (a >= b) else b)
+            elif (rule == "min"): combined.append(a if (a <= b) else b)
+            else: combined.append(a + b)
+        return combined
+
+#### Actualización #####################################################################################################
+
+    def update(self, T, values):
+        """
+        Adds a single row. O(1).
+        Inputs:
+            >> "T"...       Timestamp of the row, in nanoseconds ("int"). Rows must arrive in chronological order.
+            >> "values"...  Row values, ordered as the "rules" columns.
+        """
+        Bin = (self.Count // self.Ticks) if self.Ticks else (T - T % self.Delta)
+        self.Count = self.Count + 1
+        if (Bin == self.Bin): self.Bar = self._combine(self.Bar, values) ; return #| Misma vela: actualizar.
+        if (self.Bar != None): self._complete([self.Time], [self.Bar]) #| Vela nueva: completar la anterior.
+        self.Bin, self.Bar = Bin, list(values)
+        self.Time = T if self.Ticks else Bin
+
+    def extend(self, T, values):
+        """
+        Adds many rows at once, with no Python loop over them: each piece of every candle is aggregated with numpy's
+        "reduceat", and only the first piece is joined with the candle in progress.
+        Inputs:
+            >> "T"...       1D "int64" (nanoseconds) or "datetime64[ns]" array with the timestamps of the rows.
+            >> "values"...  2D array with one row per timestamp, ordered as the "rules" columns.
+        """
+        T, values = numpy.asarray(T).astype("int64"), numpy.asarray(values, dtype = float)
+        if (len(T) == 0): return
+        bins = self._bins(T, len(T))
+        self.Count = self.Count + len(T)
+        starts = numpy.concatenate([[0], numpy.flatnonzero(numpy.diff(bins)) + 1]) #| Primera fila de cada vela.
+        ends = numpy.concatenate([starts[1 :], [len(T)]]) #| Fila siguiente a la última de cada vela.
+        bars = numpy.empty((len(starts), len(self.Columns))) #| Cada columna, según su regla.
+        for n, rule in enumerate(self.Rules):
+            if (rule == "first"): bars[:, n] = values[starts, n]
+            elif (rule == "last"): bars[:, n] = values[ends - 1, n]
+            elif (rule == "max"): bars[:, n] = numpy.maximum.reduceat(values[:, n], starts)
+            elif (rule == "min"): bars[:, n] = numpy.minimum.reduceat(values[:, n], starts)
+            else: bars[:, n] = numpy.add.reduceat(values[:, n], starts)
+        times = T[starts] if self.Ticks else bins[starts] #| Etiqueta de cada vela.
+        bars, times, bins = bars.tolist(), times.tolist(), bins[starts].tolist()
+        if (self.Bar != None) and (bins[0] == self.Bin): #| La primera parte continúa la vela en curso.
+            bars[0], times[0] = self._combine(self.Bar, bars[0]), self.Time
+        elif (self.Bar != None): #| La vela en curso ya estaba completa.
+            bars.insert(0, self.Bar) ; times.insert(0, self.Time) ; bins.insert(0, self.Bin)
+        self.Bin, self.Time, self.Bar = bins[-1], times[-1], bars[-1] #| La última queda en curso.
+        if (len(bars) > 1): self._complete(times[: -1], bars[: -1])
+
+    def flush(self, T = None):
+        """
+        Completes the candle in progress if it is already closed, without waiting for the next row: in time frames,
+        when "T" (nanoseconds, "int") reached the end of its interval; in tick frames, when it already has "N" rows.
+        Returns "True" if a candle was completed.
+        """
+        if (self.Bar == None): return False
+        if self.Ticks: closed = (self.Count % self.Ticks == 0)
+        else: closed = (T != None) and (T >= self.Bin + self.Delta)
+        if not closed: return False
+        self._complete([self.Time], [self.Bar])
+        self.Bin, self.Time, self.Bar = None, None, None
+        return True
+
+    def _complete(self, times, bars):
+        """
+        Stores completed candles, and hands them to the callbacks.
+        """
+        times = numpy.array(times, dtype = "int64").astype("datetime64[ns]")
+        self.Store.extend_arrays(times, numpy.array(bars, dtype = float))
+        for callback in self.Callbacks:
+            for T, bar in zip(times, bars): callback(self.Frame, pandas.Timestamp(T), bar)
@@ -0,0 +1,246 @@
+import os, sys, time, threading
+import zmq, numpy, pandas
+from ZMQL import ZMQL
+from MTrack import MTrack
+from Protocol import Protocol
+from BarBuilder import BarBuilder
+
+class EASimulator(object):
+
+#### Constantes de clase ###############################################################################################
+
+    _Mirror = {"SUB": zmq.PUB, "PUSH": zmq.PULL, "PULL": zmq.PUSH} #| Tipo de socket del EA, por cada uno de ZMQL.
+    _FrameRows = 1000 #| Máxima cantidad de velas por trama binaria.
+    _Tick = 0.001 #| Segundos de espera máxima en cada vuelta del bucle de envío.
+    _MaxRows = 10000 #| Máxima cantidad de filas del dataset por vuelta del bucle de envío, por suscripción.
+    _ErrSymbol = 4106 #| "ERR_UNKNOWN_SYMBOL" de MQL4: "symbol" sin datos en el simulador.
+
+#### Constructor #######################################################################################################
+
+    def __init__(self, context, data, ports = ZMQL._PortsDef, speed = 1, start = None, verbose = 1):
+        """ Object initializer.
+        Python stand-in for the "ZMQ.mq4" Expert Advisor, so that ZMQL blocks (e.g.: MTrack) can be run, tested and
+        benchmarked without a MetaTrader terminal. It binds the same ports that ZMQL connects to, and answers "Check",
+        "Format", "OHLCV", "Ticks" and "Shutdown" messages the same way the EA does. Market data comes from historical
+        datasets (e.g.: "MarketDataRepository.get_dataset") replayed on a virtual clock: it starts at "start" and runs
+        "speed" times faster than the wall clock. "OHLCV" downloads return the candles before the virtual "now", and
+        "Ticks" subscriptions stream the candles after it through the PUB socket, as each of them closes. Candles are
+        built from the dataset rows with a "BarBuilder", for whatever timeframe is asked for. "OHLCV" CSV files are
+        written inside "ZMQL._CommonPath", so it should be set to some local folder before downloading.
+        Inputs:
+            >> "context"... "ZMQ context" object.
+            >> "data"...... "dict" with "symbols" as keys and their datasets as values: DataFrames with OHLCVS columns
+                            and datetime index, or "MarketData" objects. A single "MarketData" is also accepted.
+            >> "ports"..... Port numbers, with the same keys (ZMQL's socket types) as in ZMQL.
+            >> "speed"..... Virtual clock speed, as a multiple of real time. "None" streams as fast as possible: ZMQ
+                            drops whatever the receiver can not keep up with, which "Counters" show for binary frames.
+            >> "start"..... Datetime of the virtual clock start. Defaults to the earliest timestamp in "data".
+            >> "verbose"... "0" shows nothing. "1" shows requests and answers. "2" also shows streamed candles.
+        """
+        assert isinstance(context, zmq.sugar.context.Context), "((INIT)) ERROR! Use a valid (zmq.) \"context\" input."
+        assert all([label in EASimulator._Mirror for label in ports]), \
+               f"((INIT)) ERROR! \"ports\" keys must be ZMQL's: {list(EASimulator._Mirror)}."
+        assert (speed == None) or (speed > 0), "((INIT)) ERROR! \"speed\" must be positive, or \"None\"."
+        if not isinstance(data, dict): data = {data.symbol: data} #| Un solo "MarketData".
+        self.Data = dict() #| Datos por "symbol": marcas de tiempo (nanosegundos) y valores OHLCVS.
+        for symbol, dataset in data.items():
+            dataset = getattr(dataset, "dataset", dataset) #| "MarketData" o DataFrame.
+            dataset = dataset.reindex(columns = list(MTrack._DColumns), fill_value = 0).sort_index()
+            T = pandas.DatetimeIndex(dataset.index).to_numpy(dtype = "datetime64[ns]").astype("int64")
+            self.Data[symbol.upper()] = T, dataset.to_numpy(dtype = float)
+        self.Speed = speed
+        self.Start = pandas.Timestamp(start).value if (start != None) else min([T[0] for T, _ in self.Data.values()])
+        self.Enable = {"run": True, "verbose": verbose}
+        self.Formats = {label: "text" for label in ports} #| Formato de envío negociado, por socket de ZMQL.
+        self.Sequence = {label: 0 for label in ports} #| Numeración de tramas binarias, por socket de ZMQL.
+        self.Slots = dict() #| Suscripciones: {slot: [symbol, BarBuilder, próxima fila]}.
+        self.Lock = threading.Lock() #| "Slots" se modifican desde el bucle de pedidos.
+        self.Sockets = dict() #| Sockets del EA, con la etiqueta del socket de ZMQL al que atienden.
+        for label, port in ports.items():
+            Socket = context.socket(EASimulator._Mirror[label])
+            Socket.setsockopt(zmq.LINGER, 0)
+            Socket.bind(f"tcp://*:{port}")
+            self.Sockets[label] = Socket
+            if verbose: print(f"[[INIT]] Simulator bound to port {port}, for ZMQL's {label}.")
+        self.Clock = time.time() #| Momento real en que arranca el reloj virtual.
+        self.Threads = [threading.Thread(target = self._listen, daemon = True),
+                        threading.Thread(target = self._stream, daemon = True)]
+        for thread in self.Threads: thread.start()
+
+#### Reloj virtual #####################################################################################################
+
+    def now(self):
+        """
+        Virtual time, in nanoseconds. With "speed = None", the clock stays at "start", but streaming does not wait.
+        """
+        if (self.Speed == None): return self.Start
+        return self.Start + int((time.time() - self.Clock)*self.Speed*1e9)
+
+    @staticmethod
+    def _enum_frame(enum):
+        """
+        MTrack's timeframe enum (seconds, negative for ticks, see "_frame_enum") to "BarBuilder" frame label.
+        """
+        if (enum < 0): return f"T{round(-enum)}"
+        if (enum < 1): return f"Z{round(enum*1000)}"
+        return f"S{round(enum)}"
+
+#### Terminación #######################################################################################################
+
+    def shutdown(self):
+        """
+        Same as the EA's "OnDeinit": notifies every sending socket, and closes all of them.
+        """
+        for label in self.Sockets: self._answer(label, "{'Shutdown': 'Please wait...'}")
+        self.Enable["run"] = False
+        for thread in self.Threads:
+            if (thread != threading.current_thread()): thread.join()
+        for Socket in self.Sockets.values(): Socket.close()
+        if self.Enable["verbose"]: print("[[EXIT]] Simulator closed.")
+
+#### Envío de mensajes #################################################################################################
+
+    def _answer(self, label, message):
+        """
+        Sends a text "message" to ZMQL's socket "label", if the simulator has a sending socket towards it.
+        """
+        if (EASimulator._Mirror[label] not in (zmq.PUB, zmq.PUSH)): return
+        try: self.Sockets[label].send_string(message, zmq.DONTWAIT)
+        except zmq.error.Again: return #| Igual que el EA: sin nadie escuchando, se descarta.
+        if (self.Enable["verbose"] >= 1): print(f"<<{label}>> Simulator sent: {message}")
+
+    def _send_candles(self, label, symbol, T, values, fmt = None):
+        """
+        Sends candles to ZMQL's socket "label": one text message each, or binary frames of up to "_FrameRows" candles.
+        The format is "fmt" if given (a request that asks for one), or else the one negotiated for the socket.
+        """
+        Socket = self.Sockets[label]
+        if ((fmt or self.Formats[label]) == "binary"):
+            for n in range(0, len(T), EASimulator._FrameRows):
+                rows = slice(n, n + EASimulator._FrameRows)
+                Socket.send(Protocol.pack_candles(symbol, T[rows]/1e9, values[rows], self.Sequence[label]))
+                self.Sequence[label] += 1
+            return
+        for t, row in zip((T/1e9).tolist(), numpy.asarray(values).tolist()):
+            Socket.send_string(str({symbol: [t] + row}))
+
+#### Atención de pedidos ###############################################################################################
+
+    def _listen(self):
+        """
+        Request loop, as the EA's "OnTimer": reads every ";"-separated request arriving from ZMQL and answers it.
+        """
+        receivers = [label for label in self.Sockets if (EASimulator._Mirror[label] == zmq.PULL)]
+        Poller = zmq.Poller()
+        for label in receivers: Poller.register(self.Sockets[label], zmq.POLLIN)
+        while self.Enable["run"]:
+            polled = dict(Poller.poll(ZMQL._PollTimeout))
+            for label in receivers:
+                if (polled.get(self.Sockets[label]) != zmq.POLLIN): continue
+                request = self.Sockets[label].recv_string().split(";")
+                if (self.Enable["verbose"] >= 1): print(f">>{label}<< Simulator received: {request}")
+                try: self._process(request)
+                except Exception as ex: print(f">>{label}<< Simulator error on {request[0]}: {ex}")
+                sys.stdout.flush()
+
+    def _process(self, request):
+
+        action = request[0]
+        answer = "PULL" if ("PULL" in self.Sockets) else None #| Socket de ZMQL que recibe las respuestas.
+        if (action == "Check"): #| Como en el EA: responder por todos los sockets de envío.
+            if ("SUB" in self.Sockets): self._answer("SUB", "{'Check': 'SUB'}")
+            if answer: self._answer(answer, "{'Check': 'PUSH'}")
+        if (action == "Format"):
+            label, fmt = request[1], request[2]
+            if (label in self.Formats) and (fmt in Protocol._Formats): self.Formats[label] = fmt
+            content = [label, fmt] if (self.Formats.get(label) == fmt) else (label, fmt)
+            if answer: self._answer(answer, str({"Format": content}))
+        if (action == "OHLCV") and answer: self._answer(answer, self._response_OHLCV(answer, *request[1 : 5]))
+        if (action == "Ticks") and answer: self._answer(answer, self._response_Ticks(*request[1 : 4]))
+        if (action == "Shutdown"): threading.Thread(target = self.shutdown).start()
+
+    def _response_OHLCV(self, label, symbol, enum, rows, mode):
+        """
+        Historical candles before the virtual "now". Written as a CSV in "_CommonPath", as the EA does, or sent
+        through the "label" socket as binary frames if "mode" is "binary".
+        """
+        tf, rows = int(float(enum)), int(rows) #| "enum" en minutos, como en MQL4.
+        if (symbol not in self.Data): return str({"OHLCV": (symbol, tf, -1, EASimulator._ErrSymbol)})
+        T, values = self.Data[symbol]
+        past = numpy.searchsorted(T, self.now()) #| Filas anteriores a "now".
+        builder = BarBuilder(f"S{60*tf}", MTrack._DColumns, max(rows, 1))
+        builder.extend(T[: past], values[: past])
+        T, values = builder.Store.Time[builder.Store.Start : builder.Store.End], builder.Store.Values
+        values = values[builder.Store.Start : builder.Store.End]
+        if (len(T) == 0): return str({"OHLCV": (symbol, tf, -1, EASimulator._ErrSymbol)})
+        T = T.astype("int64")
+        t1, t2 = int(T[0]//10**9), int(T[-1]//10**9)
+        if (mode == "binary"):
+            self._send_candles(label, symbol, T, values, fmt = "binary") #| Pedido en binario, negociado o no.
+            return str({"OHLCV": [symbol, tf, t1, t2, len(T)]})
+        datapath = ZMQL._CommonPath + f"OHLCV\\{symbol} {60*tf} {t1} {t2}.csv" #| Misma ubicación que en MTrack.
+        os.makedirs(os.path.dirname(datapath), exist_ok = True)
+        index = pandas.DatetimeIndex(T.astype("datetime64[ns]"), name = "Datetime")
+        pandas.DataFrame(values, index = index, columns = list(MTrack._DColumns)).to_csv(datapath)
+        return str({"OHLCV": [symbol, tf, t1, t2]})
+
+    def _response_Ticks(self, symbol, enum, slot):
+        """
+        Subscription (or unsubscription, with "enum = 0") of a "slot" to the "symbol" candles after the virtual "now".
+        """
+        enum, slot = float(enum), int(slot)
+        with self.Lock:
+            if (enum == 0): self.Slots.pop(slot, None) ; return str({"Ticks": [symbol, enum]})
+            if (symbol not in self.Data): return str({"Ticks": (symbol, EASimulator._ErrSymbol)})
+            T, _ = self.Data[symbol]
+            builder = BarBuilder(EASimulator._enum_frame(enum), MTrack._DColumns, EASimulator._MaxRows)
+            now = min(self.now(), T[-1] + 1)
+            if builder.Delta: now = now - now % builder.Delta #| Vela en curso completa, desde su primera fila.
+            self.Slots[slot] = [symbol, builder, numpy.searchsorted(T, now)]
+        return str({"Ticks": [symbol, enum]})
+
+#### Transmisión de datos ##############################################################################################
+
+    def _publish(self, symbol, builder):
+        """
+        Sends every candle completed by the "builder" since the last call, and empties its "Store".
+        """
+        T, values = builder.Store.since(None)
+        if (len(T) == 0) or ("SUB" not in self.Sockets): return
+        if (self.Enable["verbose"] >= 2): print(f"<<SUB>> Simulator sent: {symbol} {len(T)} candle(s) up to {T[-1]}")
+        self._send_candles("SUB", symbol, T.astype("int64"), values)
+        builder.Store.clear()
+
+    def _stream(self):
+        """
+        Streaming loop, as the EA's "OnTick": each dataset row reached by the virtual clock goes into the "BarBuilder"
+        of every slot subscribed to its "symbol", and the candles that close are published together.
+        """
+        while self.Enable["run"]:
+            now = self.now() if self.Speed else numpy.iinfo("int64").max #| Sin "speed": todo lo que quede.
+            with self.Lock:
+                for slot in self.Slots.values():
+                    symbol, builder, row = slot
+                    T, values = self.Data[symbol]
+                    end = numpy.searchsorted(T, now, "right") #| Filas alcanzadas por el reloj virtual.
+                    end = min(end, row + EASimulator._MaxRows)
+                    if (end > row): builder.extend(T[row : end], values[row : end])
+                    slot[2] = end
+                    builder.flush(min(now, T[end]) if (end < len(T)) else numpy.iinfo("int64").max) #| "T[end]": sin leer.
+                    self._publish(symbol, builder)
+            time.sleep(EASimulator._Tick)
+
+#### Unit test al ejecutar este código #################################################################################
+
+if (__name__ == "__main__"):
+
+    from SIAX.Misc.MarketDataRepository import MarketDataRepository
+    ZMQL._CommonPath = os.path.join(os.getcwd(), "Common", "") #| Carpeta local en lugar de la de MetaTrader.
+    data = MarketDataRepository().get_dataset("SENO", "M1", rows = 20000, source = "DUMMY")
+    start = data.dataset.index[10000]                   #| Historia: 10 mil velas. El resto se transmite.
+    SIM = EASimulator(zmq.Context(), {"BTCUSD": data}, speed = 600, start = start)  #| 10 minutos por segundo.
+    INST = MTrack(zmq.Context(), verbose = 1)           #| Conectar "MTrack" al simulador, en vez de a MetaTrader.
+    INST.download("BTCUSD", "M1", 5000)  ;  time.sleep(1)
+    INST.subscribe("BTCUSD", "M1", 0)  ;  time.sleep(10) #| Unas 100 velas nuevas.
+    print(INST.Base["BTCUSD"][-15:])
+    INST._shutdown()  ;  SIM.shutdown()
@@ -1,5 +1,7 @@
-import datetime, pandas, time, ZMQL
+import datetime, numpy, pandas, threading, time, ZMQL
 from ZMQL import ZMQL
+from RingBuffer import RingBuffer
+from BarBuilder import BarBuilder
 
 class MTrack(ZMQL):
 
@@ -13,11 +15,12 @@ class MTrack(ZMQL):
     _TFError2 = "\"frame\" should be chosen from between MT4 standards."
     _TFMT4s = ["M1", "M5", "M15", "M30", "H1", "H4", "D1", "W1", "MN"]
     _SlotError = "\"slot\" must be an integer. Also check amount of slots in EA config."
-    _MaxRows = 1000000 #| Máxima cantidad de filas en todos los DataFrames dentro de Base.
+    _MaxRows = 100000 #| Máxima cantidad de filas POR instrumento dentro de Base.
 
 #### Constructor #######################################################################################################
 
-    def __init__(self, context, verbose = 1):
+    def __init__(self, context, verbose = 1, max_rows = None, drain = True, rcvhwm = 10000, sndhwm = 1, ports = None,
+                 metrics = 0):
         """
         Object initializer
         This is the Data exchange block that inquires MQL through ZMQ for market data, either synchronous or async.
@@ -25,6 +28,12 @@ class MTrack(ZMQL):
         it avails the use of wrapper methods that predefine certain messages such as "OHLCV" for data history download,
         and "Ticks" for instantaneous data streaming. An important new addition is the designation of the data "Base" as
         a "dict" with distinct symbol datasets and variables whose update is automated by the custom "_process" method.
+        Each symbol dataset is a fixed-capacity "RingBuffer": appending a candle is O(1), the oldest candles are evicted
+        beyond "max_rows", and its "frame()" method gives a DataFrame view of the stored candles for readers.
+        Larger timeframes of the same symbol can be tracked at once with "track" (see "BarBuilder"): they are built
+        online from each new candle stored in "Base", without resampling it again.
+        Strategies do not need to poll the "Flag" in "_Config" for new candles: "wait" blocks until a symbol gets new
+        data, and returns a consistent copy of its last rows; "listen" registers callbacks for the same event.
         Finally, it presents the new "Sim" method as a crossover between "OHLCV" and "Ticks": it emulates the stream of
         data by means of scanning an historical market data file and its content.
         Note: Port numbers for sockets are predefined as {"SUB": 65530, "PUSH": 65531, "PULL": 65532} by default. Try
@@ -34,10 +43,25 @@ class MTrack(ZMQL):
             >> "verbose"... Control variable. "= 0" disables console prints aside from prioritary Python errors
                             (e.g.: assertions). "1" enables MQL responses as of using "download" and "subscribe"
                             functions. "2" shows asynchronous market data stream incoming through SUB socket.
+            >> "max_rows"...Maximum amount of candles kept per symbol. Defaults to "_MaxRows".
+            >> "drain"..... Read every waiting message at once, and process them as a batch. See ZMQL's "_receive".
+            >> "rcvhwm".... Max. amount of messages queued in each receiving socket before ZMQ starts dropping them.
+            >> "sndhwm".... Max. amount of messages queued in each sending socket.
+            >> "ports"..... Port numbers, as in ZMQL. Only needed when working with more than one terminal.
+            >> "metrics"... Seconds between prints of the reception metrics, as in ZMQL. Streamed candles also add
+                            their end-to-end "Latency" (see "_latency").
         """
 
-        ports = {"SUB": 65530, "PUSH": 65531, "PULL": 65532}
-        super().__init__(context, ID = "MTrack", ports = ports, verbose = verbose)
+        self.MaxRows = max_rows if max_rows else MTrack._MaxRows #| Capacidad de cada "RingBuffer".
+        self.Bars = dict() #| Velas de mayor temporalidad: {symbol: {frame: BarBuilder}}. Ver "track".
+        self.Durations = dict() #| Segundos de cada vela, por "symbol" (0 en marcos de ticks). Ver "_latency".
+        self.Offset = None #| Segundos de adelanto del reloj del EA respecto de UTC ("GMT_BROKER"). "None": estimarlo.
+        self.Conditions = dict() #| Candado de escritura/lectura de cada "symbol", para avisar de datos nuevos.
+        self.Versions = dict() #| Cantidad de actualizaciones de cada "symbol". Ver "wait".
+        self.Listeners = dict() #| Funciones a llamar ante datos nuevos, por "symbol". Ver "listen".
+        ports = ports if ports else {"SUB": 65530, "PUSH": 65531, "PULL": 65532}
+        super().__init__(context, ID = "MTrack", ports = ports, verbose = verbose, drain = drain,
+                         rcvhwm = rcvhwm, sndhwm = sndhwm, metrics = metrics)
         #| Base de datos. Las "Keys" serán los instrumentos ("symbols").
         self.Base = {"_Config": pandas.DataFrame(columns = ["Frame", "Flag", "Slot"])}
 
@@ -117,7 +141,7 @@ class MTrack(ZMQL):
         """
         Create new symbol in data "Base".
         Given a certain "symbol" and a certain time "frame", it creates its own new OHLCVS DataFrame inside "Base" and
-        saves its configuration variables inside the "_Config" dataframe.
+        saves its configuration variables inside the "_Config" dataframe. Such OHLCVS storage is a "RingBuffer".
         Inputs:
             >> "symbol"...  Symbol (string) associated with a tradable instrument in MetaTrader.
             >> "frame"...   Timeframe label (string) following MetaTrader standards.
@@ -139,10 +163,17 @@ class MTrack(ZMQL):
             print(f"[[{subject}]] Resampling \"{symbol}\" from \"{prev}\" to \"{frame}\"...")
             self.Base["_Config"].loc[symbol, "Frame"] = frame #| Reemplazar por "frame" nuevo.
             #| Ante un nuevo "frame", hacer el "reframe" de los datos almacenados hasta ahora.
-            self.Base[symbol] = MTrack._reframe(frame, self.Base[symbol])
+            with self.Conditions[symbol]:
+                reframed = MTrack._reframe(frame, self.Base[symbol].frame())
+                self.Base[symbol] = RingBuffer(MTrack._DColumns.keys(), self.MaxRows)
+                self.Base[symbol].extend(reframed.dropna()) #| Sin velas vacías al bajar la precisión.
+            self._notify(symbol)
         else: #| Si "symbol" es nuevo, darle un espacio en "Base", y todos los elementos necesarios.
-            self.Base[symbol] = pandas.DataFrame(columns = MTrack._DColumns.keys())
+            self.Conditions[symbol], self.Versions[symbol] = threading.Condition(), 0
+            self.Listeners.setdefault(symbol, list())
+            self.Base[symbol] = RingBuffer(MTrack._DColumns.keys(), self.MaxRows)
             self.Base["_Config"].loc[symbol, :] = frame, False, None #| Configuración base.
+        self.Durations[symbol] = max(MTrack._frame_enum(frame), 0) #| Para "_latency".
         return symbol, frame #| Devolver "symbol" y "frame" (no None) como prueba de que salió todo bien.
 
 #### Procesamiento en recepción ########################################################################################
@@ -162,15 +193,64 @@ class MTrack(ZMQL):
         if (subject == "OHLCV"): self._response_OHLCV(content)
         symbol = subject #| Suponer que el asunto del mensaje es un "symbol".
         if (subject in self.Base.keys()): #| Si cumple, el "content" es un dato de mercado.
-            T = pandas.to_datetime(content[0], unit = "s") #| Traducir unix a fecha/hora.
-            data = self.Base[symbol] #| Tomar base de datos del "symbol".
-            if not data.empty and (T <= data.index[-1]): return #| Descartar datos viejos.
-            data.loc[T, :] = content[1:]  #| Si son datos recientes, adjuntarlos a la Data.
-            self.Base["_Config"].loc[symbol, "Flag"] = True #| Notificar a las estrategias en "MThink".
-            #| Máxima cantidad de filas POR instrumento.
-            max_rows = MTrack._MaxRows/len(self.Base)
-            #| Borrar excedentes de Data mas antiguos, para no saturar la memoria.
-            if (len(data) > max_rows): data = data.iloc[-max_rows:, :]
+            T = pandas.Timestamp(content[0], unit = "s") #| Traducir unix a fecha/hora.
+            with self.Conditions[symbol]: #| Ningún lector ("wait") ve la vela a medio guardar.
+                data = self.Base[symbol] #| Tomar base de datos del "symbol".
+                if not data.empty and (T <= data.last_time()): return #| Descartar datos viejos.
+                #| Si son datos recientes, adjuntarlos a la Data. Al llenarse, se desaloja la vela más antigua.
+                data.append(T, content[1:])
+                for builder in self.Bars.get(symbol, {}).values(): builder.update(T.value, content[1:])
+            self._notify(symbol) #| Notificar a las estrategias en "MThink".
+            self._latency(symbol, content[0])
+
+    def _process_records(self, records):
+        """
+        Received binary records parsing procedure.
+        Same as "_process" for market data, but for a whole binary frame (see "Protocol") at once: candles are grouped
+        by symbol and stored in bulk inside each "RingBuffer", with no Python loop over the single candles.
+        Inputs:
+            >> "records"... numpy structured array, as decoded by "Protocol.unpack" in ZMQL's "_dispatch".
+        """
+        symbols = records["Symbol"]
+        for symbol in numpy.unique(symbols): #| Un solo bloque por "symbol".
+            rows = records[symbols == symbol]
+            symbol = symbol.decode()
+            if (symbol not in self.Base): continue #| Descartar "symbols" no registrados.
+            T = numpy.round(rows["Time"]*1e9).astype("int64").astype("datetime64[ns]") #| Unix a fecha/hora.
+            with self.Conditions[symbol]:
+                last = self.Base[symbol].last_time()
+                self.Base[symbol].extend_arrays(T, rows["Values"]) #| Adjuntar a la Data, descartando datos viejos.
+                self._feed(symbol, last)
+            self._notify(symbol) #| Notificar a las estrategias en "MThink".
+            self._latency(symbol, rows["Time"])
+
+    def _latency(self, symbol, T):
+        """
+        End-to-end latency of streamed candles: seconds since the EA closed them until they were stored in "Base". The
+        EA stamps each candle with its opening time (or its first tick's, in tick frames) on the broker's clock, so the
+        candle's duration and the broker's time zone ("Offset") are discounted. If "Offset" is "None", it is estimated
+        from the first candle, rounded to 15 minutes (as time zones are). Only recorded for SUB sockets: downloaded
+        history is not "live".
+        Inputs:
+            >> "symbol"...  Symbol of the candles.
+            >> "T"......... EA's timestamp (unix seconds) of a candle, or numpy array with many of them.
+        """
+        if not str(self.Receiving).startswith("SUB"): return
+        lag = time.time() - (T + self.Durations.get(symbol, 0)) #| Latencia, más el huso horario del broker.
+        if (self.Offset == None): self.Offset = -900*round(float(numpy.min(lag))/900)
+        metrics = self.Metrics[self.Receiving]
+        if numpy.ndim(lag): metrics.add_many("Latency", lag + self.Offset)
+        else: metrics.add("Latency", lag + self.Offset)
+
+    def _feed(self, symbol, last):
+        """
+        Hands the candles stored in "Base" after "last" (timestamp, or "None" for all of them) to every "BarBuilder"
+        tracking the "symbol", in a single bulk update each.
+        """
+        builders = self.Bars.get(symbol)
+        if not builders: return
+        T, values = self.Base[symbol].since(last)
+        for builder in builders.values(): builder.extend(T, values)
 
 #### Ante respuestas de solicitudes OHLCV ##############################################################################
 
@@ -181,21 +261,28 @@ class MTrack(ZMQL):
         in "Common Data Folder" ("_CommonPath"), this function retrieves said file and turns it into DataFrame inside
         our data "Base". Notification contents are commonly formatted as: "[symbol, frame, start date, end date]". If
         any of these arrays is a "tuple" (with "()" brackets as delimiters), it implies there has been an error.
+        When the download was requested as "binary", MQL4 sends the candles themselves through the PULL socket as
+        binary frames (already stored in "Base" by "_process_records" by now), and adds the amount of rows sent at the
+        end of the notification: "[symbol, frame, start date, end date, rows]". No CSV is read in such case.
         Inputs:
             >> "content"... The array describing the downloaded OHLCVS CSV file.
         """
-        symbol, frame, t1, t2 = content #| Usamos los datos del mensaje para identificar el archivo.
+        symbol, frame, t1, t2 = content[: 4] #| Usamos los datos del mensaje para identificar el archivo.
         if isinstance(content, tuple): #| Si llegó a haber un error, el mensaje contendría una "tuple".
-            error = MTrack._MQErrors[content[-1]] #| Obtenemos la descripción del error desde el listado.
+            error = MTrack._error(content[-1]) #| Obtenemos la descripción del error desde el listado.
             error = f"(\"{symbol}, {frame}\") -> \"{error}\"." #| Armamos el aviso del error para mostrar.
             if (self.Enable["verbose"] >= 1): #| Si el grado de verbose es 1 o mayor...
                 print("((OHLCV)) Warning! MQL error:", error) #| Reportamos el error en pantalla.
             return #| Terminamos la función acá, ya que no existe ningún CSV de tal "content".
+        if (len(content) > 4): return #| Descarga binaria: los datos ya llegaron por el socket PULL.
         datapath = MTrack._CommonPath + f"OHLCV\\{symbol} {60*frame} {t1} {t2}.csv" #| Ubicación del CSV.
         new_data = pandas.read_csv(datapath, index_col = 0) #| CSV a DataFrame. "Datetime" pasa a ser index.
         new_data.index = pandas.to_datetime(new_data.index) #| Identificamos las marcas de tiempo como fecha/hora.
-        #| Descartar última fila (incompleta). Al resto, llevarlo a nuestra Data.
-        self.Base[symbol] = self.Base[symbol].copy().append(new_data)
+        with self.Conditions[symbol]: #| Llevar las filas nuevas a nuestra Data, sin copiar lo que ya estaba.
+            last = self.Base[symbol].last_time()
+            self.Base[symbol].extend(new_data)
+            self._feed(symbol, last)
+        self._notify(symbol)
 
 #### Ante respuestas de solicitudes Ticks ##############################################################################
 
@@ -212,25 +299,29 @@ class MTrack(ZMQL):
         symbol = content[0]
         if isinstance(content, tuple): #| Si hubo algún error por parte de MQL...
             #| Tomar al nº de error al final de "content", y buscar su descripción.
-            error = MTrack._MQErrors[content[-1]]
+            error = MTrack._error(content[-1])
             error = f"\"{symbol}\" -> \"{error}\"."
             #| Mostrar en pantalla, si el grado de "verbose" es 1 o mayor.
             if (self.Enable["verbose"] >= 1): print("((Ticks)) Warning! MQL error:", error)
         
 #### Solicitud de datos históricos #####################################################################################
 
-    def download(self, symbol, frame, rows = 10000):
+    def download(self, symbol, frame, rows = 10000, binary = False):
         """
         Function for OHLCVS data download.
         It sends a message with the request for historical market data, and awaits for MQL4 to notify that the
         corresponding CSV file is ready to be imported to "Base". Request must be formulated in MQL4 standards
         ("enum" in minutes, not in seconds). The CSV reading process is done in the background by the parallel
         "_receive" Thread, and "_response_OHLCV" function.
+        With "binary", MQL4 is asked to skip the CSV and send the candles as binary frames (see "Protocol") through
+        the PULL socket instead: they are decoded in bulk and written straight into the symbol's "RingBuffer". An EA
+        that does not know about it just ignores the request field, and answers with the CSV as usual.
         Inputs:
             >> "symbol"...  Symbol (string) associated with a tradable instrument in MetaTrader.
             >> "frame"...   Timeframe label (string). It must be available in MetaTrader.
             >> "rows"...    Theoretical amount of rows to be downloaded, since actual timestamp. Can result in
                             a lesser amount of them, depending on MetaTrader's storage availability.
+            >> "binary"...  If "True", request the candles as binary frames instead of a CSV file.
         """
         if not (frame in MTrack._TFMT4s):
             print("((Download)) ERROR!", MTrack._TFError2, MTrack._TFMT4s); return
@@ -239,7 +330,9 @@ class MTrack(ZMQL):
         symbol, frame = self._setup_symbol(symbol, frame, "OHLCV") #| Crear dict en "Base" si el "symbol" no existe.
         if (symbol == None) or (frame == None): return #| Ante algún error al ingresar "symbol" o "frame", abandonar.
         enum = MTrack._frame_enum(frame)/60 #| Enum en MTrack se mide en segundos. Enum en MQL se mide en minutos.
-        self._send(label = "PUSH", message = f"OHLCV;{symbol};{enum};{rows};;;;;;") #| Armar y enviar mensaje.
+        mode = "binary" if binary else "" #| Campo opcional: formato de entrega de los datos.
+        self._send(label = "PUSH", message = f"OHLCV;{symbol};{enum};{rows};{mode};;;;;") #| Armar y enviar mensaje.
+        return True #| Solicitud enviada.
 
 #### Solicitud de (de)suscripción a datos ##############################################################################
 
@@ -267,6 +360,7 @@ class MTrack(ZMQL):
         self.Base["_Config"].loc[symbol, "Slot"] = slot #| Guardar para seguimiento local, y para desuscribirse mas tarde.
         enum_Py = MTrack._frame_enum(frame) #| Convertir de "frame" en string a enum con las reglas ya planteadas.
         self._send(label = "PUSH", message = f"Ticks;{symbol};{enum_Py};{slot};;;;;;") #| Armar y enviar mensaje.
+        return True #| Solicitud enviada.
 
     def unsubscribe(self, symbol):
         """
@@ -280,6 +374,110 @@ class MTrack(ZMQL):
         if (slot >= 0): self._send(label = "PUSH", message = "Ticks;"";0;%d;;;;;;" % slot) #| Armar y enviar mensaje.
         self.Base["_Config"].loc[symbol, "Slot"] = None
 
+#### Aviso de datos nuevos ############################################################################################
+
+    def _notify(self, symbol):
+        """
+        New data announcement: sets the "Flag" in "_Config", increases the "symbol" version, wakes up every thread in
+        "wait" for it, and calls its "listen" callbacks (outside of the lock, so readers are not blocked meanwhile).
+        """
+        condition = self.Conditions[symbol]
+        with condition:
+            self.Versions[symbol] += 1
+            version = self.Versions[symbol]
+            self.Base["_Config"].at[symbol, "Flag"] = True
+            condition.notify_all()
+        for callback in self.Listeners[symbol]: callback(symbol, version)
+
+    def listen(self, symbol, callback):
+        """
+        Function for new data callbacks.
+        Registers "callback" to be called as "callback(symbol, version)" each time new candles of "symbol" are stored
+        in "Base". It is called from the "_receive" Thread, so it should return quickly (e.g.: by handing the work to
+        another thread). "snapshot" gives a consistent copy of the data from there.
+        Inputs:
+            >> "symbol"...  Symbol (string) associated with a tradable instrument in MetaTrader.
+            >> "callback"...Function with two inputs: "symbol" and the new "version" (see "wait").
+        """
+        symbol = MTrack._check_symbol(symbol, "Listen")
+        if (symbol == None): return
+        self.Listeners.setdefault(symbol, list()).append(callback)
+
+    def snapshot(self, symbol, rows = None):
+        """
+        Function for consistent data reading.
+        Returns the current "version" of "symbol", and a DataFrame with a copy of its last "rows" candles (all of them
+        if "None"), taken while "_receive" can not write them. Unlike "Base[symbol].frame()", whose arrays get reused
+        as new candles arrive, it is never torn nor overwritten. Only the requested rows are copied.
+        Inputs:
+            >> "symbol"...  Symbol (string) already requested through "download" or "subscribe".
+            >> "rows"...    Amount of candles to copy, from the newest one backwards.
+        """
+        if (symbol not in self.Conditions):
+            print(f"((Snapshot)) ERROR! Symbol \"{symbol}\" not in store.") ; return None
+        with self.Conditions[symbol]:
+            return self.Versions[symbol], self.Base[symbol].snapshot(rows)
+
+    def wait(self, symbol, version = None, rows = None, timeout = None):
+        """
+        Function for new data waiting.
+        Blocks the calling thread until "symbol" has a version newer than "version", and returns its "snapshot" right
+        away: there is no need to poll the "Flag" in "_Config". Each update of "Base" (one streamed candle, a binary
+        frame or a download) increases the version by 1, so a consumer can pass the last version it saw, and miss no
+        update even if it was busy when it happened. Returns "None" if nothing arrived within "timeout" seconds.
+        Inputs:
+            >> "symbol"...  Symbol (string) already requested through "download" or "subscribe".
+            >> "version"... Last version seen by the consumer. "None" waits for the next update.
+            >> "rows"...    Amount of candles in the snapshot. See "snapshot".
+            >> "timeout"... Max. amount of seconds to wait. "None" waits forever.
+        """
+        if (symbol not in self.Conditions):
+            print(f"((Wait)) ERROR! Symbol \"{symbol}\" not in store.") ; return None
+        condition = self.Conditions[symbol]
+        with condition:
+            version = self.Versions[symbol] if (version == None) else version
+            if not condition.wait_for(lambda: self.Versions[symbol] > version, timeout): return None
+            return self.Versions[symbol], self.Base[symbol].snapshot(rows)
+
+#### Seguimiento de temporalidades mayores ###########################################################################
+
+    def track(self, symbol, frame, callback = None):
+        """
+        Function for online candle building.
+        Starts building "frame" candles for "symbol" out of each new candle that gets stored in its "Base" dataset
+        (downloaded or streamed), so that many timeframes (e.g.: "M1", "M5" and "H1") can be followed at the same time
+        with a single subscription, and with no "_reframe" of the whole dataset on each update. Completed candles are
+        kept in "Bars[symbol][frame].Store", and handed to the "callback" function (if any) as soon as they close.
+        The candle still in progress is returned by "Bars[symbol][frame].current()". The "frame" should be a multiple
+        of the one in "Base". A new builder starts from the candles already stored in "Base", so its first candle is
+        not left partial (the "callback" is only called for candles closed after that). Returns the "BarBuilder" object.
+        Inputs:
+            >> "symbol"...  Symbol (string) associated with a tradable instrument in MetaTrader.
+            >> "frame"...   Timeframe label (string) of the candles to be built.
+            >> "callback"...Function called as "callback(frame, T, values)" with each completed candle. Called from the
+                            "_receive" Thread, so it should return quickly.
+        """
+        symbol = MTrack._check_symbol(symbol, "Track")
+        time_unit, N = MTrack._check_frame(frame, "Track")
+        if (time_unit == None) or (symbol == None): return None
+        #| El Thread de "_receive" recorre "Bars[symbol]": cambiarlo sólo con el candado del "symbol".
+        with self.Conditions.get(symbol, threading.Lock()):
+            builders = self.Bars.setdefault(symbol, dict())
+            if frame not in builders:
+                builder = BarBuilder(frame, MTrack._DColumns, self.MaxRows)
+                if (symbol in self.Base): builder.extend(*self.Base[symbol].since(None)) #| Velas ya guardadas.
+                builders[frame] = builder
+            if callback: builders[frame].Callbacks.append(callback)
+        return builders[frame]
+
+    def untrack(self, symbol, frame = None):
+        """
+        Stops building "frame" candles for "symbol" (every frame, if "None"). Built candles are discarded as well.
+        """
+        with self.Conditions.get(symbol, threading.Lock()): #| Mismo candado que en "track".
+            if (frame == None): self.Bars.pop(symbol, None)
+            else: self.Bars.get(symbol, {}).pop(frame, None)
+
 #### Archivado de datos ################################################################################################
 
     def save(self, symbol, x1 = 0, x2 = 1):
@@ -304,7 +502,7 @@ class MTrack(ZMQL):
         enum = enum if (0 < enum < 1) else int(enum)
         x1 = round(min(x1, x2)*len(self.Base[symbol]))
         x2 = round(max(x1, x2)*len(self.Base[symbol]))
-        data = self.Base[symbol].iloc[x1 : x2, :]
+        data = self.Base[symbol].frame().iloc[x1 : x2, :]
         t1 = round(data.index[x1].timestamp())
         t2 = round(data.index[x2 - 1].timestamp())
         filename = f"Ticks\\{symbol} {enum} {t1} {t2}.csv"
@@ -0,0 +1,112 @@
+import math, time, numpy
+
+class Metrics(object):
+
+#### Constantes de clase ###############################################################################################
+
+    _Series = ("Depth", "Decode", "Process", "Latency") #| Magnitudes medidas por socket.
+    _Decades = (-7, 4) #| Rango de los histogramas: de 0.1 microsegundos (o mensajes) a 10000 segundos (o mensajes).
+    _PerDecade = 20 #| Intervalos por década: cada uno ~12% más ancho que el anterior.
+
+#### Constructor #######################################################################################################
+
+    def __init__(self, window = 10, windows = 6):
+        """
+        Object initializer
+        Rolling timing metrics of a single receiving socket in ZMQL. Each series in "_Series" is kept as a histogram
+        with logarithmic bins (so adding a sample is O(1) and memory is fixed) split in "windows" consecutive time
+        windows of "window" seconds each: the oldest one is emptied and reused as time goes by, so percentiles always
+        describe (roughly) the last "window*windows" seconds. The series are:
+            >> "Depth"..... Messages waiting in the socket on each poll (the batch read by "_drain"). Near "_MaxBatch",
+                            the Python side is not keeping up with the EA.
+            >> "Decode".... Seconds taken to decode each message ("eval" for text, "Protocol.unpack" for binary).
+            >> "Process"... Seconds taken by each "_process" (or "_process_records") call.
+            >> "Latency"... Seconds from the EA's timestamp of a row until it is stored (see "MTrack._process").
+        Inputs:
+            >> "window"...  Seconds covered by each histogram window.
+            >> "windows"... Amount of windows kept.
+        """
+        self.Window = window
+        bins = (Metrics._Decades[1] - Metrics._Decades[0])*Metrics._PerDecade
+        #| Valor representativo de cada intervalo: su media geométrica.
+        self.Values = 10**(Metrics._Decades[0] + (numpy.arange(bins) + 0.5)/Metrics._PerDecade)
+        self.Counts = numpy.zeros((len(Metrics._Series), windows, bins), dtype = "int64")
+        self.Messages = numpy.zeros(windows, dtype = "int64") #| Mensajes recibidos en cada ventana.
+        self.Starts = numpy.full(windows, time.time()) #| Inicio de cada ventana.
+        self.Current = 0 #| Ventana en uso.
+        self.Index = {series: n for n, series in enumerate(Metrics._Series)}
+
+#### Registro de muestras ##############################################################################################
+
+    @staticmethod
+    def _bin(value, bins):
+        """
+        Histogram bin of a single "value". Values out of range go to the first or last bin.
+        """
+        if (value <= 0): return 0
+        n = int((math.log10(value) - Metrics._Decades[0])*Metrics._PerDecade)
+        return 0 if (n < 0) else min(n, bins - 1)
+
+    def rotate(self, now = None):
+        """
+        Moves on to the next window (emptying it) when the current one is older than "window" seconds. Called once
+        per batch by ZMQL's "_dispatch", instead of on each sample.
+        """
+        now = time.time() if (now == None) else now
+        if (now - self.Starts[self.Current] < self.Window): return
+        self.Current = (self.Current + 1) % len(self.Messages)
+        self.Counts[:, self.Current] = 0
+        self.Messages[self.Current] = 0
+        self.Starts[self.Current] = now
+
+    def count(self, messages):
+        """
+        Adds "messages" to the amount received in the current window, for the message "Rate".
+        """
+        self.Messages[self.Current] += messages
+
+    def add(self, series, value):
+        """
+        Adds a single sample ("value") to a "series".
+        """
+        self.Counts[self.Index[series], self.Current, Metrics._bin(value, self.Counts.shape[2])] += 1
+
+    def add_many(self, series, values):
+        """
+        Adds many samples at once (numpy array), with no Python loop over them.
+        """
+        values = numpy.asarray(values, dtype = float)
+        bins = self.Counts.shape[2]
+        with numpy.errstate(divide = "ignore", invalid = "ignore"):
+            n = numpy.floor((numpy.log10(values) - Metrics._Decades[0])*Metrics._PerDecade)
+        n = numpy.clip(numpy.nan_to_num(n, nan = 0, neginf = 0), 0, bins - 1).astype(int)
+        self.Counts[self.Index[series], self.Current] += numpy.bincount(n, minlength = bins)
+
+#### Lectura ###########################################################################################################
+
+    def rate(self, now = None):
+        """
+        Messages per second, over the time covered by the windows.
+        """
+        now = time.time() if (now == None) else now
+        span = now - self.Starts.min()
+        return self.Messages.sum()/span if (span > 0) else 0.0
+
+    def percentile(self, series, q):
+        """
+        "q" percentile (between 0 and 100) of a "series", over every window. "NaN" if there are no samples. The result
+        is accurate to the bin width (~12%).
+        """
+        counts = self.Counts[self.Index[series]].sum(axis = 0).cumsum()
+        if (counts[-1] == 0): return numpy.nan
+        return self.Values[numpy.searchsorted(counts, q/100*counts[-1])]
+
+    def summary(self):
+        """
+        "dict" with the message rate, and the 50% and 99% percentiles of each series (e.g.: "Decode p99").
+        """
+        summary = {"Rate": self.rate()}
+        for series in Metrics._Series:
+            summary[f"{series} p50"] = self.percentile(series, 50)
+            summary[f"{series} p99"] = self.percentile(series, 99)
+        return summary
@@ -0,0 +1,71 @@
+import struct, numpy
+
+class Protocol(object):
+
+#### Constantes de clase ###############################################################################################
+
+    #| Toda trama binaria empieza con "_Tag" (los mensajes de texto empiezan con "{"), seguido de una letra que indica
+    #| el tipo de registro, el número de secuencia de la trama y la cantidad de registros (ambos "uint32"). Luego, los
+    #| registros empaquetados uno tras otro. El emisor numera sus tramas de a 1, para que se detecten las perdidas.
+    _Tag = b"#"
+    _Header = struct.Struct("<1s1sII") #| Tag, tipo de registro, número de secuencia, cantidad de registros.
+    #| Registro de vela (o tick, en marcos temporales "T"): símbolo, tiempo unix en segundos y valores OHLCVS (en ese
+    #| orden, como "MTrack._DColumns"). Los valores son un sub-array: "records['Values']" es una matriz, sin copias.
+    _Candle = numpy.dtype([("Symbol", "S12"), ("Time", "<f8"), ("Values", "<f8", (6,))])
+    _Records = {b"C": _Candle} #| Tipos de registro, por letra.
+    _Formats = ("text", "binary") #| Formatos negociables por socket.
+
+#### Detección de tramas ###############################################################################################
+
+    @staticmethod
+    def is_binary(message):
+        """
+        Tells whether a raw ZMQ "message" (bytes) is a binary frame or a text (dict-like) one.
+        """
+        return message[: 1] == Protocol._Tag
+
+#### Empaquetado #######################################################################################################
+
+    @staticmethod
+    def pack_candles(symbols, times, values, sequence = 0):
+        """
+        Packs many candles into a single binary frame.
+        Inputs:
+            >> "symbols"... One symbol string per candle, or a single string shared by all of them.
+            >> "times"..... Unix timestamps in seconds (floats allow sub-second frames).
+            >> "values".... 2D array-like with one row per candle, and OHLCVS columns in "_DColumns" order.
+            >> "sequence".. Frame number. Should grow by 1 on each frame sent through the same socket.
+        """
+        values = numpy.asarray(values, dtype = float).reshape(-1, 6)
+        records = numpy.empty(len(values), dtype = Protocol._Candle)
+        records["Symbol"] = numpy.char.encode(numpy.asarray(symbols, dtype = str), "ascii")
+        records["Time"] = times
+        records["Values"] = values
+        header = Protocol._Header.pack(Protocol._Tag, b"C", sequence % 2**32, len(records))
+        return header + records.tobytes()
+
+#### Desempaquetado ####################################################################################################
+
+    @staticmethod
+    def unpack(message):
+        """
+        Decodes a whole binary frame at once, without any Python loop over its records.
+        Returns the record kind letter (string), the frame's sequence number and a numpy structured array with the
+        records.
+        Inputs:
+            >> "message"... Raw bytes as received from the socket. Must start with "_Tag".
+        """
+        tag, kind, sequence, count = Protocol._Header.unpack_from(message)
+        assert (tag == Protocol._Tag) and (kind in Protocol._Records), "ERROR! Not a valid binary frame."
+        dtype = Protocol._Records[kind] #| Formato de registro según la letra.
+        assert (len(message) == Protocol._Header.size + count*dtype.itemsize), "ERROR! Truncated binary frame."
+        return kind.decode(), sequence, numpy.frombuffer(message, dtype = dtype, count = count, offset = Protocol._Header.size)
+
+    @staticmethod
+    def to_messages(records):
+        """
+        Converts decoded candle records into the usual text-protocol messages, e.g.: "{'EURUSD': [t, O, H, L, C, V, S]}".
+        Slow path, only meant for "_process" methods that do not handle records in bulk.
+        """
+        symbols, times, values = records["Symbol"].tolist(), records["Time"].tolist(), records["Values"].tolist()
+        return [{symbol.decode(): [T] + row} for symbol, T, row in zip(symbols, times, values)]
@@ -0,0 +1,155 @@
+import numpy, pandas
+
+class RingBuffer:
+
+#### Constructor #######################################################################################################
+
+    def __init__(self, columns, capacity):
+        """
+        Object initializer
+        Fixed-capacity market data store for a single symbol inside "MTrack.Base". Candles are written into preallocated
+        numpy arrays (one for timestamps, one 2D array for values) so appending a new row is O(1) and memory stays flat
+        no matter how long the stream lasts: once "capacity" rows are stored, each new row evicts the oldest one.
+        Arrays are twice as long as "capacity", and the stored rows are always a contiguous block inside them. When the
+        block reaches the end of the arrays, it is moved back to the beginning with a single copy (once every "capacity"
+        appends at most), so reading the whole store is a view and never needs to unwrap the ring.
+        Inputs:
+            >> "columns"...     Column labels of the store. Usually "MTrack._DColumns" keys (OHLCVS).
+            >> "capacity"...    Maximum amount of rows kept. Older rows are discarded beyond it.
+        """
+        assert isinstance(capacity, int) and (capacity > 0), "ERROR! \"capacity\" must be a positive integer."
+        self.Columns = list(columns) #| Etiquetas de columnas, en orden.
+        self.Capacity = capacity #| Máxima cantidad de filas guardadas.
+        self.Time = numpy.empty(2*capacity, dtype = "datetime64[ns]") #| Marcas de tiempo (index).
+        self.Values = numpy.empty((2*capacity, len(self.Columns)), dtype = float) #| Datos OHLCVS.
+        self.Start, self.End = 0, 0 #| Las filas guardadas son "[Start : End]".
+        self.Frame = None #| DataFrame en cache, hasta la próxima modificación.
+
+#### Propiedades básicas ###############################################################################################
+
+    def __len__(self):
+
+        return self.End - self.Start
+
+    @property
+    def empty(self):
+
+        return (self.End == self.Start)
+
+    def last_time(self):
+        """
+        Timestamp of the newest row, or "None" if the store is empty.
+        """
+        if self.empty: return None
+        return pandas.Timestamp(self.Time[self.End - 1])
+
+#### Escritura de datos ################################################################################################
+
+    def _compact(self):
+        """
+        Moves the stored rows to the beginning of the arrays when there is no free room left after them.
+        """
+        if (self.End < len(self.Time)): return #| Todavía hay lugar al final: no hacer nada.
+        size = self.End - self.Start #| Copiar las filas vigentes al principio.
+        self.Time[: size] = self.Time[self.Start : self.End]
+        self.Values[: size] = self.Values[self.Start : self.End]
+        self.Start, self.End = 0, size
+
+    def append(self, T, values):
+        """
+        Adds a single row at the end of the store. If full, the oldest row is discarded.
+        Inputs:
+            >> "T"...       Timestamp of the new row ("datetime", "Timestamp" or "datetime64").
+            >> "values"...  Row values, ordered as "Columns".
+        """
+        self._compact() #| Asegurar lugar para una fila más.
+        self.Time[self.End] = T
+        self.Values[self.End] = values
+        self.End = self.End + 1
+        if (self.End - self.Start > self.Capacity): self.Start = self.Start + 1 #| Desalojar la más antigua.
+        self.Frame = None
+
+    def extend(self, data):
+        """
+        Adds many rows at once, from a DataFrame with datetime index. See "extend_arrays".
+        Inputs:
+            >> "data"...    Dataframe with (at least) the store's columns, and datetime objects as index.
+        """
+        T = pandas.DatetimeIndex(data.index).to_numpy(dtype = "datetime64[ns]")
+        self.extend_arrays(T, data[self.Columns].to_numpy(dtype = float))
+
+    def extend_arrays(self, T, values):
+        """
+        Adds many rows at once. As in "MTrack._process", a row is discarded when it is not newer than every row before
+        it (stored or not). Only the last "capacity" rows are kept in the end.
+        Inputs:
+            >> "T"...       1D "datetime64[ns]" array with the timestamps of the new rows.
+            >> "values"...  2D array with one row per timestamp, ordered as "Columns".
+        """
+        T = numpy.asarray(T, dtype = "datetime64[ns]")
+        last = self.Time[self.End - 1].astype("int64") if not self.empty else numpy.iinfo("int64").min
+        previous = numpy.maximum.accumulate(numpy.concatenate([[last], T.astype("int64")]))[: -1]
+        newer = (T.astype("int64") > previous) #| Descartar datos viejos.
+        T, values = T[newer][-self.Capacity :], values[newer][-self.Capacity :] #| Nunca hacen falta mas filas.
+        new = len(T)
+        if (new == 0): return
+        keep = min(len(self), self.Capacity - new) #| Filas viejas que sobreviven.
+        if (self.End + new > len(self.Time)): #| Si no entran al final, llevar las que quedan al principio.
+            self.Time[: keep] = self.Time[self.End - keep : self.End]
+            self.Values[: keep] = self.Values[self.End - keep : self.End]
+            self.End = keep
+        self.Time[self.End : self.End + new] = T
+        self.Values[self.End : self.End + new] = values
+        self.End = self.End + new
+        self.Start = self.End - keep - new
+        self.Frame = None
+
+    def clear(self):
+
+        self.Start, self.End = 0, 0
+        self.Frame = None
+
+#### Lectura de datos ##################################################################################################
+
+    def frame(self):
+        """
+        DataFrame of the stored rows, built over views of the internal arrays (no data is copied). It is cached until
+        the next modification. As the arrays get reused, rows inside an old frame might be overwritten by later appends:
+        use ".copy()" on it to keep a snapshot.
+        """
+        if (self.Frame is None):
+            index = pandas.DatetimeIndex(self.Time[self.Start : self.End], copy = False)
+            self.Frame = pandas.DataFrame(self.Values[self.Start : self.End], index = index,
+                                          columns = self.Columns, copy = False)
+        return self.Frame
+
+    def snapshot(self, rows = None):
+        """
+        DataFrame with a copy of the last "rows" stored rows (all of them if "None"): unlike "frame", it is not affected
+        by later writes. Only the requested rows are copied.
+        """
+        start = self.Start if (rows == None) else max(self.Start, self.End - rows)
+        index = pandas.DatetimeIndex(self.Time[start : self.End].copy())
+        return pandas.DataFrame(self.Values[start : self.End].copy(), index = index, columns = self.Columns)
+
+    def since(self, T):
+        """
+        Timestamps and values (views, not copies) of the rows newer than "T". All of them if "T" is "None".
+        """
+        start = self.Start
+        if (T != None): start += numpy.searchsorted(self.Time[self.Start : self.End], numpy.datetime64(T, "ns"), "right")
+        return self.Time[start : self.End], self.Values[start : self.End]
+
+    def __getitem__(self, key): #| Compatibilidad con el uso de "Base[symbol]" como DataFrame.
+
+        return self.frame()[key]
+
+    def __getattr__(self, name): #| ".iloc", ".index", ".to_csv", etc. se leen del DataFrame.
+
+        if name.startswith("_") or name in ("Columns", "Capacity", "Time", "Values", "Start", "End", "Frame"):
+            raise AttributeError(name)
+        return getattr(self.frame(), name)
+
+    def __repr__(self):
+
+        return repr(self.frame())
@@ -1,6 +1,8 @@
 import os, sys, time, threading
-import zmq, datetime, pandas
+import zmq, datetime, numpy, pandas
 from random import random
+from Protocol import Protocol
+from Metrics import Metrics
 
 class ZMQL(object):
 
@@ -10,12 +12,18 @@ class ZMQL(object):
     _CommonPath = os.path.expanduser("~") + "\\AppData\\Roaming\\MetaQuotes\\Terminal\\Common\\Files\\"
     #| Nombres de puertos; deben llevar al principio y en mayusculas, el TIPO (ej.: "PUSH Data", "REP Trading", etc.)
     _PortsDef = {"SUB": 65530, "PUSH": 65531, "PULL": 65532} #| Puertos de cada socket. Deben ser ints.
-    #| Lista de códigos de error de MT4 con sus descripciones, en formato "pandas.Series". Descargar de Google Drive.
-    _MQErrors = pandas.read_csv("https://drive.google.com/uc?id=1YFLpNNbJMd-NaZNjEklN4snBD-wcKc9r").set_index("#")
+    #| Lista de códigos de error de MT4 con sus descripciones: {código: descripción}. Se carga al consultarla por primera
+    #| vez (ver "_error"), desde la copia incluida en el repositorio. Google Drive queda solo como respaldo.
+    _MQErrors = None
+    _MQErrorsPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "MQL4ErrorCodes.csv")
+    _MQErrorsURL = "https://drive.google.com/uc?id=1YFLpNNbJMd-NaZNjEklN4snBD-wcKc9r"
+    _PollTimeout = 100 #| Milisegundos de espera máxima en cada "poll". Permite cerrar el hilo de recepción.
+    _MaxBatch = 10000 #| Máxima cantidad de mensajes leídos de una vez, por socket, en modo "drain".
+    _SendPause = 0.02 #| Segundos de espera luego de cada envío, para darle tiempo a la llegada de la respuesta.
     
 #### Constructor #######################################################################################################
 
-    def __init__(self, context, ID, ports = _PortsDef, verbose = 1): 
+    def __init__(self, context, ID, ports = _PortsDef, verbose = 1, drain = False, rcvhwm = 1, sndhwm = 1, metrics = 0):
         """ Object initializer.
         This is the basic building block of the communication pipeline flowchart. Personal adaptations of this scheme
         (e.g.: each one of the blocks in the trading system) will be a subclass of this, and shall inherit the following
@@ -30,6 +38,14 @@ class ZMQL(object):
             >> "verbose"... Control variable. "= None" disables console prints aside from prioritary Python errors
                             (e.g.: assertions). "False" enables reports related to message sending, PULL responses
                             and MQL4 errors. "True" prints SUB responses (e.g.: tick data, active trade data).
+            >> "drain"..... If "True", each time a receiving socket is polled, every message waiting in it is read at
+                            once (non-blocking) and processed as a batch. Otherwise, one message per poll is read,
+                            followed by a short pause. See "_receive".
+            >> "rcvhwm".... High water mark (max. amount of queued messages) of receiving sockets. Beyond it, ZMQ
+                            drops new messages silently. "1" only keeps the latest message.
+            >> "sndhwm".... High water mark of sending sockets.
+            >> "metrics"... Seconds between prints of the receiving sockets' "metrics" table. "0" never prints it
+                            (metrics are recorded anyway, see "metrics").
         """
         assert verbose in (0, 1, 2), "((INIT)) ERROR! \"verbose\" may either be integer \"0\", \"1\" or \"2\"."
         assert isinstance(context, zmq.sugar.context.Context), "((INIT)) ERROR! Use a valid (zmq.) \"context\" input."
@@ -37,10 +53,17 @@ class ZMQL(object):
         assert isinstance(ports, dict) and all([isinstance(port, int) for port in ports.values()]), warn
         assert (len(ports.values()) == len(set(ports.values()))), warn + " Each key/value must be unique."
         assert isinstance(ID, str), "((INIT)) ERROR! \"ID\" string must differ from other block IDs."
+        assert all([isinstance(hwm, int) and (hwm >= 0) for hwm in (rcvhwm, sndhwm)]), \
+               "((INIT)) ERROR! \"rcvhwm\" and \"sndhwm\" must be non-negative integers (0: no limit)."
+        assert (metrics >= 0), "((INIT)) ERROR! \"metrics\" must be a non-negative amount of seconds."
 
         #| Dataframe con objetos de comunicación: con todas las variables de acceso al protocolo.
         self.Comm = pandas.DataFrame(columns = ["Port"], index = ports.keys(), data = ports.values())
-        self.Enable = {"comm": True, "verbose": verbose} #| Diccionario con parámetros de control.
+        self.Enable = {"comm": True, "verbose": verbose, "drain": drain, "metrics": metrics} #| Parámetros de control.
+        self.Counters = dict() #| Contadores de recepción por socket. Ver "_dispatch".
+        self.Metrics = dict() #| Tiempos y tasas de recepción por socket. Ver "metrics".
+        self.Receiving = None #| Socket cuyos mensajes se están procesando, para las métricas de las subclases.
+        self.Dumped = time.time() #| Momento de la última impresión de métricas.
         self.Poller = zmq.Poller() #| Inicializar "poll" para empezar a detectar llegada de mensajes.
         self.Base = dict()
 
@@ -54,18 +77,31 @@ class ZMQL(object):
             self.Comm.loc[label, "Socket"] = Socket #| Guardar socket en DataFrame de objetos de comunicación.
             Socket.connect(f"tcp://localhost:{ports[label]}") #| Conectar cada dirección al protocolo común (ethernet).
             if (enum == zmq.SUB): Socket.setsockopt(zmq.SUBSCRIBE, b"{") #| Limitar memoria para cache de puertos SUB.
+            if (enum == zmq.SUB): Socket.setsockopt(zmq.SUBSCRIBE, Protocol._Tag) #| Tramas binarias, si se negocian.
             if enum in (zmq.PUB, zmq.PUSH, zmq.ROUTER): self.Comm.loc[label, "Role"] = "S"
             if enum in (zmq.SUB, zmq.PULL, zmq.DEALER): self.Comm.loc[label, "Role"] = "R"
             if enum in (zmq.REQ, zmq.REP, zmq.PAIR): self.Comm.loc[label, "Role"] = "SR"
-            if "S" in self.Comm.loc[label, "Role"]: Socket.setsockopt(zmq.SNDHWM, 1)
-            if "R" in self.Comm.loc[label, "Role"]: Socket.setsockopt(zmq.RCVHWM, 1)
+            if "S" in self.Comm.loc[label, "Role"]: Socket.setsockopt(zmq.SNDHWM, sndhwm)
+            if "R" in self.Comm.loc[label, "Role"]: Socket.setsockopt(zmq.RCVHWM, rcvhwm)
+            #| Mensajes procesados, perdidos, con error, y lotes leídos. "Dropped" sólo cuenta tramas binarias.
+            if "R" in self.Comm.loc[label, "Role"]:
+                self.Counters[label] = {"Processed": 0, "Dropped": 0, "Errors": 0, "Batches": 0, "Sequence": None}
+                self.Metrics[label] = Metrics()
             if "R" in self.Comm.loc[label, "Role"]: self.Poller.register(Socket, zmq.POLLIN)
             self.Comm.loc[label, "Cache"] = "" #| Crear columna en DataFrame como "inbox de últimos mensajes".
+            self.Comm.loc[label, "Format"] = "text" #| Formato de mensajes. Ver "_negotiate".
             Socket.setsockopt(zmq.LINGER, 0) #| Al eliminar los sockets, se elimina cualquier fila de espera que tenga.
             #| Initialize poll set for message parsing.
         print("---------------------------------------"*2)
 
         self.Comm[["Port", "Enum"]] = self.Comm[["Port", "Enum"]].astype(int) #| Guardar "Enums" de ZMQ como ints.
+        self._start(ID)
+
+    def _start(self, ID):
+        """ Receiver start.
+        Launches the parallel "(self.)Thread" that runs "_receive", and checks the connection with MetaTrader.
+        Subclasses with a different receiving scheme (e.g.: "AZMQL", with asyncio) replace this.
+        """
         self.Thread = threading.Thread(name = ID, target = self._receive)
         self.Thread.daemon = True #| Detención inmediata ante cierre del programa.
         self.Thread.start()
@@ -87,6 +123,13 @@ class ZMQL(object):
             if EA and ("S" in self.Comm.loc[label, "Role"]): self._send(label, "Shutdown")
         time.sleep(0.5) #| Esperar a que responda confirmando su propia terminación.
         self.Enable["comm"] = False #| Desactivar comunicación: sockets PUSH y SUB.
+        self._disconnect()
+        if thread: self.Thread.join() #| Unirlo con el hilo principal, y cerrar ambos ya juntos.
+        del self
+
+    def _disconnect(self):
+        """ Socket disconnection. Only called from "_shutdown", once "Enable['comm']" is "False".
+        """
         for label in self.Comm.index: #| Por cada socket...
             #| Dar el "listener" de baja, si es un socket de recepción.
             if "R" in self.Comm.loc[label, "Role"]:
@@ -96,8 +139,6 @@ class ZMQL(object):
             self.Comm["Socket"][label].disconnect(address) #| Disasociar de dirección.
             print(f"[[EXIT]] {label} Disconnected from port {port}.") #| Informar en consola.
         print("---------------------------------------"*2) 
-        if thread: self.Thread.join() #| Unirlo con el hilo principal, y cerrar ambos ya juntos.
-        del self
 
 #### Transmisión de mensajes ###########################################################################################
 
@@ -113,9 +154,10 @@ class ZMQL(object):
         message += ";"*(9 - message.count(";")) #| Completar con los separadores que falten.
         self.Comm.loc[label, "Cache"] = message #| Antes que nada, conservar copia del mensaje.
         try: #| Poner mensaje en "fila de espera" del socket. Enviar de inmediato apenas disponible.
-            self.Comm["Socket"][label].send_string(message, zmq.DONTWAIT)
+            sent = self.Comm["Socket"][label].send_string(message, zmq.DONTWAIT)
+            if hasattr(sent, "result"): sent.result() #| Sockets de asyncio: "Future" ya resuelto por "DONTWAIT".
             if (self.Enable["verbose"] >= 1): print(f"<<{label}>> Command sent: [{message}]")
-            time.sleep(0.02) #| Esperar un poco para darle tiempo a la llegada de la respuesta.
+            time.sleep(self._SendPause) #| Esperar un poco para darle tiempo a la llegada de la respuesta.
         except zmq.error.Again: #| Limitar la espera del mensaje. Informar cuando esperó demasiado.
             print(f"<<{label}>> Warning! Timeout with no response... try again.")
 
@@ -137,38 +179,189 @@ class ZMQL(object):
                 print(f">>{label}<< ERROR! MQL4 \"check\" not answering!")  ;  return False
         return True #| Si está todo bien y no hubo un error en el camino, devolver "True".
 
+#### Negociación de formato ############################################################################################
+
+    def _negotiate(self, label, fmt = "binary", timeout = 1):
+        """ Message format negotiation.
+        Asks MQL to use a certain message format on one of our receiving sockets. MQL shall answer through any
+        receiving socket with "{'Format': ['label', 'format']}" once the change is made, and from then on, messages
+        arriving to that socket may be binary frames (see "Protocol"). If no answer arrives before "timeout" (e.g.: an
+        older EA that does not know about formats), the socket keeps the text format, which is always understood.
+        Either way, each received message is identified by its first byte, so both formats can be mixed safely.
+        Returns "True" if MQL agreed to the change.
+        Inputs:
+            >> "label"..... "label" of a receiving socket row. Role in Comm (DF) must be "R" (receiver).
+            >> "fmt"....... One of "Protocol._Formats": "binary" or "text".
+            >> "timeout"... Seconds to wait for MQL's answer.
+        """
+        assert fmt in Protocol._Formats, f"((FORMAT)) ERROR! \"fmt\" must be one of {Protocol._Formats}."
+        assert "R" in self.Comm.loc[label, "Role"], "((FORMAT)) ERROR! Formats are negotiated for receiving sockets."
+        for sender in self.Comm.index: #| El pedido sale por el primer socket de envío.
+            if "S" in self.Comm.loc[sender, "Role"]: self._send(sender, f"Format;{label};{fmt}") ; break
+        t = time.time() + timeout
+        while (self.Comm.loc[label, "Format"] != fmt) and (time.time() < t): time.sleep(0.01)
+        return (self.Comm.loc[label, "Format"] == fmt)
+
+    def _response_Format(self, content):
+        """ Format negotiation answer.
+        Registers the format that MQL agreed to use for a socket. Content is "[label, format]". If it is a "tuple"
+        instead, MQL refused the change and the socket keeps its current format.
+        """
+        if isinstance(content, tuple) or (content[0] not in self.Comm.index): return
+        self.Comm.loc[content[0], "Format"] = content[1]
+
 #### Recepción de mensajes #############################################################################################
 
     def _receive(self): 
         """ Message receiver.
         This should never be executed directly. Must ONLY be accessed and running in the parallel "(self.)Thread".
+        In "drain" mode, all messages already waiting in a polled socket are read at once, and handed together to
+        "_dispatch": consecutive binary frames are joined into a single "_process_records" call. Without it, a single
+        message is read per poll, and a short pause follows (so no more than ~1000 messages per second are read).
         """
+        #| Sockets de recepción, con su etiqueta. No cambian luego de "__init__".
+        receivers = {self.Comm["Socket"][label]: label for label in self.Counters}
         while self.Enable["comm"]: #| Dentro del hilo paralelo, siempre y cuando este parámetro de control sea "True"...
-            sockets_polled = dict(self.Poller.poll()) #| Chequear cuales son los puertos que han recibido algo.
-            for label in self.Comm.index: #| Tomar a cada uno de los puertos que tengo registrados.
-                Socket = self.Comm["Socket"][label] #| De ellos, tomar a cada uno de los sockets.
-                if (Socket not in sockets_polled.keys()): continue #| Saltear los que no son de recepción. 
-                if (sockets_polled[Socket] != zmq.POLLIN): continue #| Saltear los que no hayan recibido nada.
-                try: message = self.Comm["Socket"][label].recv_string(zmq.DONTWAIT) #| Formular respuesta como string.
-                except: message = None #| Si no se pudo formular el string de respuesta, es que no hubo respuesta.
-                if message: #| Si se formuló una respuesta, parsearla literalmente como una "linea de Python".
-                    try: self._process(eval(message)) #| Por ejemplo: "eval('x = 2')" hace que "x" sea "2".
-                    #| "_process" va a ser una función que va a procesar la variable implicada.
-                    except AssertionError: #| Dada una condición de cierre explicita dentro de "_process"...
-                        print(f">>{label}<< ERROR! Forced shutdown condition --> {message}")
-                        self.Enable["comm"] = False #| Detención del proceso...
-                    except Exception as ex: #| Cuando hubo un error al procesarla...
-                        if (self.Enable["verbose"] >= 1): #| Si se activó el verbose de errores "no graves"...
-                            Type = str(type(ex))[8:-2] #| Conseguir el tipo de error en formato string.
-                            Line = ex.__traceback__.tb_next.tb_next.tb_lineno #| Conseguir nº de linea del error.
-                            warning = f"{Type}: {ex.args[0]}..." #| Armar mensaje de error y mostrar.
-                            print(f">>{label}<< Warning! Process error at line {Line} ===>", warning)
-                        continue #| No bloquear el bucle paralelo de recepción luego de un error de recepción.
-                    self.Comm.loc[label, "Cache"] = message #| Guardar string en Cache de puerto tal y como llegó.
-                    v = self.Enable["verbose"] #| 1º grado incluye todos los "R" menos "SUB". 2º grado incluye "SUB". 
-                    if (v > 1) or (v and (label != "SUB")): print(f">>{label}<< Received -> {message}", flush = True)
-                    sys.stdout.flush() #| Mostrar cualquier cosa que haya sido impresa por esta vía, en consola.
-                    time.sleep(0.001) #| Apenas pausar al sistema para impedir saturación de punto de recepción.
+            #| Chequear cuales son los puertos que han recibido algo. El "timeout" permite salir del bucle al cerrar.
+            sockets_polled = dict(self.Poller.poll(ZMQL._PollTimeout))
+            for Socket, label in receivers.items(): #| Tomar a cada uno de los sockets de recepción.
+                if (sockets_polled.get(Socket) != zmq.POLLIN): continue #| Saltear los que no hayan recibido nada.
+                limit = ZMQL._MaxBatch if self.Enable["drain"] else 1 #| Cantidad de mensajes a leer.
+                messages = ZMQL._drain(Socket, limit) #| Recibir bytes: texto o tramas binarias.
+                if messages: self._dispatch(label, messages) #| Si no se pudo recibir, es que no hubo respuesta.
+                sys.stdout.flush() #| Mostrar cualquier cosa que haya sido impresa por esta vía, en consola.
+                if not self.Enable["drain"]: time.sleep(0.001) #| Apenas pausar al sistema para impedir saturación.
+
+    @staticmethod
+    def _drain(Socket, limit):
+        """ Non-blocking socket reading.
+        Reads messages (as bytes) from "Socket" until it is empty, or until "limit" messages were read.
+        """
+        messages = list()
+        while (len(messages) < limit):
+            try: messages.append(Socket.recv(zmq.DONTWAIT))
+            except zmq.error.ZMQError: break #| "Again": socket vacío.
+        return messages
+
+    def _dispatch(self, label, messages):
+        """ Received messages parsing.
+        Text messages are parsed literally as a "line of Python" (e.g.: "eval('x = 2')" makes "x" be "2") and go to
+        "_process" one by one. Binary frames (see "Protocol") are decoded in bulk, and consecutive ones are joined so
+        that "_process_records" is called once for all of them. "Counters[label]" keeps track of "Processed" messages,
+        "Errors" while processing them, and "Dropped" binary frames: those missing in their sequence numbering, which
+        ZMQ discarded beyond the high water marks. Text messages carry no sequence number, so their loss is NOT seen:
+        "Dropped" only covers binary frames, and stays at 0 on a socket that still uses text (the default). Negotiate
+        "binary" (see "_negotiate") on sockets where losses must be detected.
+        Inputs:
+            >> "label"...... "label" of the receiving socket row in Comm (DF).
+            >> "messages"... List of raw messages (bytes), in arrival order.
+        """
+        counters, metrics = self.Counters[label], self.Metrics[label]
+        counters["Batches"] += 1
+        metrics.rotate() ; metrics.count(len(messages)) ; metrics.add("Depth", len(messages))
+        self.Receiving = label
+        pending, cache = list(), None #| Registros binarios consecutivos. Último mensaje procesado.
+        for message in messages + [b""]: #| El mensaje vacío final procesa los registros pendientes.
+            if Protocol.is_binary(message): #| Decodificar la trama entera de una sola vez.
+                t = time.perf_counter()
+                try: kind, sequence, records = Protocol.unpack(message)
+                except Exception as ex: self._warn(label, ex) ; counters["Errors"] += 1 ; continue
+                metrics.add("Decode", time.perf_counter() - t)
+                if (counters["Sequence"] != None) and (sequence > counters["Sequence"] + 1): #| Tramas perdidas.
+                    counters["Dropped"] += sequence - counters["Sequence"] - 1
+                counters["Sequence"] = sequence
+                if pending and (pending[0].dtype != records.dtype): #| Otro tipo de registro: procesar lo anterior.
+                    cache = self._handle(label, pending, cache)
+                    pending = list()
+                pending.append(records) ; continue
+            if pending: cache = self._handle(label, pending, cache) ; pending = list()
+            if message: cache = self._handle(label, message.decode(), cache)
+            if not self.Enable["comm"]: break #| Condición de cierre dentro de "_process".
+        #| Guardar último string en Cache de puerto tal y como llegó. Una sola vez por lote.
+        if (cache != None): self.Comm.loc[label, "Cache"] = cache
+        period = self.Enable["metrics"]
+        if period and (time.time() - self.Dumped >= period): self._dump()
+
+    def _handle(self, label, message, cache):
+        """ Single message (or joined binary frames) processing, with the usual error handling.
+        Returns the string to be kept in the socket's "Cache" (the former "cache" if there was an error).
+        """
+        frames = len(message) if isinstance(message, list) else 1
+        metrics = self.Metrics[label]
+        try:
+            if isinstance(message, list): #| Tramas binarias, ya decodificadas.
+                records = numpy.concatenate(message) if (frames > 1) else message[0]
+                message = f"<{frames} binary frames, {len(records)} records>" #| Para "Cache" y "verbose".
+                t = time.perf_counter()
+                self._process_records(records)
+            else: #| Mensaje de texto: "_process" va a procesar la variable implicada.
+                t0 = time.perf_counter()
+                parsed = eval(message)
+                subject = next(iter(parsed)) if isinstance(parsed, dict) else None
+                t = time.perf_counter() ; metrics.add("Decode", t - t0)
+                if (subject == "Format"): self._response_Format(parsed[subject])
+                else: self._process(parsed)
+            metrics.add("Process", time.perf_counter() - t)
+        except AssertionError: #| Dada una condición de cierre explicita dentro de "_process"...
+            print(f">>{label}<< ERROR! Forced shutdown condition --> {message}")
+            self.Enable["comm"] = False #| Detención del proceso...
+            return cache
+        except Exception as ex: #| Cuando hubo un error al procesarla...
+            self._warn(label, ex) ; self.Counters[label]["Errors"] += frames
+            return cache #| No bloquear el bucle paralelo de recepción luego de un error de recepción.
+        self.Counters[label]["Processed"] += frames
+        v = self.Enable["verbose"] #| 1º grado incluye todos los "R" menos "SUB". 2º grado incluye "SUB".
+        if (v > 1) or (v and (label != "SUB")): print(f">>{label}<< Received -> {message}", flush = True)
+        return message
+
+    def _warn(self, label, ex):
+        """ Non-critical process error report. Shown if "verbose" is 1 or more.
+        """
+        if (self.Enable["verbose"] < 1): return #| Si se activó el verbose de errores "no graves"...
+        Type = str(type(ex))[8:-2] #| Conseguir el tipo de error en formato string.
+        tb = ex.__traceback__ #| Conseguir nº de linea del error: la más interna.
+        while tb.tb_next: tb = tb.tb_next
+        warning = f"{Type}: {ex.args[0] if ex.args else ''}..." #| Armar mensaje de error y mostrar.
+        print(f">>{label}<< Warning! Process error at line {tb.tb_lineno} ===>", warning)
+
+#### Códigos de error de MQL ##########################################################################################
+
+    @staticmethod
+    def _error(code):
+        """ MQL error description.
+        Returns the description of an MQL4 error "code". The list is read on the first call only, from the CSV file
+        that ships with the repository (no network access), or from Google Drive if it is missing. Unknown codes (or
+        no list at all) give a generic description instead of an error.
+        """
+        if (ZMQL._MQErrors == None): #| Primera consulta: cargar la lista.
+            ZMQL._MQErrors = dict()
+            for source in (ZMQL._MQErrorsPath, ZMQL._MQErrorsURL):
+                try: table = pandas.read_csv(source)
+                except Exception: continue #| Sin archivo, o sin conexión: probar la siguiente fuente.
+                ZMQL._MQErrors = dict(zip(table["#"].astype(int), table["Error"])) ; break
+        try: return ZMQL._MQErrors.get(int(code), f"Unknown MQL error #{code}.")
+        except (TypeError, ValueError): return f"Unknown MQL error \"{code}\"."
+
+#### Métricas de recepción ############################################################################################
+
+    def metrics(self):
+        """ Reception metrics.
+        Returns a DataFrame with one row per receiving socket: message "Rate" (per second), the 50% and 99% percentiles
+        of "Depth" (messages waiting on each poll), "Decode" and "Process" times (seconds), and the end-to-end
+        "Latency" of market data (seconds, only recorded by subclasses that know the EA's timestamps, e.g.: MTrack).
+        Percentiles cover the last minute, roughly (see "Metrics"). "Counters" are added as well. When "Depth" is
+        close to "_MaxBatch", or "Dropped" grows, Python is not keeping up with the EA. "Dropped" only counts lost
+        binary frames: text messages carry no sequence number, so it reads 0 on text sockets even if some were lost.
+        """
+        rows = {label: {**self.Metrics[label].summary(), **self.Counters[label]} for label in self.Metrics}
+        return pandas.DataFrame.from_dict(rows, orient = "index").drop(columns = "Sequence")
+
+    def _dump(self):
+        """ Periodic print of the "metrics" table, every "Enable['metrics']" seconds.
+        """
+        self.Dumped = time.time()
+        with pandas.option_context("display.width", 200, "display.max_columns", None, "display.precision", 6):
+            print(f"[[METRICS]] {datetime.datetime.now()}", self.metrics(), sep = "\n", flush = True)
 
 #### Procesamiento en recepción ########################################################################################
 
@@ -178,6 +371,15 @@ class ZMQL(object):
         """
         assert (random() > 1/20) #| Simulamos una condición crítica: por cada 10 ciclos, 1 me devolverá "AssertionError".
 
+    def _process_records(self, records):
+        """ Received binary records processing.
+        Default: converts the decoded records back into text-protocol messages and hands them to "_process" one by
+        one. Subclasses that care for speed should override this with a bulk (vectorized) procedure.
+        Inputs:
+            >> "records"... numpy structured array, as decoded by "Protocol.unpack".
+        """
+        for message in Protocol.to_messages(records): self._process(message)
+
 #### Unit test al ejecutar este código #################################################################################
 
 if (__name__ == "__main__"):
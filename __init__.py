@@ -1,5 +1,32 @@
-from SIAX.Misc import *
-from SIAX.NeuralNetworks import *
-from SIAX.TrainingSession import *
-from SIAX.Backtest import *
-from SIAX.PreProcessing import *
\ No newline at end of file
+# Las clases se importan recién al usarlas (ver LazyModule): importar SIAX
+# para usar sólo el Backtest no carga TensorFlow ni matplotlib.
+from SIAX.LazyModule import LazyModule
+
+LazyModule.install(__name__, {
+  # Misc
+  'MarketData': 'SIAX.Misc',
+  'MarketDataRepository': 'SIAX.Misc',
+  'MarketDataStream': 'SIAX.Misc',
+  # NeuralNetworks
+  'ModelConfiguration': 'SIAX.NeuralNetworks',
+  'ModelBase': 'SIAX.NeuralNetworks',
+  'NormalizedWindowGenerator': 'SIAX.NeuralNetworks',
+  'WindowGenerator': 'SIAX.NeuralNetworks',
+  'WindowGeneratorFactory': 'SIAX.NeuralNetworks',
+  'NeuralNetworkStrategy': 'SIAX.NeuralNetworks',
+  # TrainingSession
+  'PredictionEvaluation': 'SIAX.TrainingSession',
+  'PredictionEvaluator': 'SIAX.TrainingSession',
+  'TrainingSession': 'SIAX.TrainingSession',
+  # Backtest
+  'Backtest': 'SIAX.Backtest',
+  'BacktestSweep': 'SIAX.Backtest',
+  'TradeLedger': 'SIAX.Backtest',
+  # PreProcessing
+  'DataFramePlotting': 'SIAX.PreProcessing',
+  'DataFrameProcessing': 'SIAX.PreProcessing',
+  'PreProcessor': 'SIAX.PreProcessing',
+  'CompiledPreProcessor': 'SIAX.PreProcessing',
+  'KeepColumnsPreProcessor': 'SIAX.PreProcessing',
+  'DiffPreProcessor': 'SIAX.PreProcessing',
+})